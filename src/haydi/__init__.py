@@ -24,9 +24,14 @@ from .base.lts import DLTS, DLTSProduct, dlts_from_dict  # noqa
 # Pipeline
 from .base.pipeline import Pipeline  # noqa
 from .base.runtime.distributedcontext import DistributedContext  # noqa
+from .base.runtime.parallelcontext import ParallelContext  # noqa
+from .base.runtime.policy import (SchedulingPolicy, ThroughputPolicy,  # noqa
+                                  LatencyPolicy, FixedSizePolicy)
 
 # Canonical forms
 from .base.cnf import canonize, expand, is_isomorphic, compare, sort  # noqa
+from .base.cnf import (CanonizeCache, set_canonize_cache,  # noqa
+                       isomorphism_classes, orbit_size)
 
 # Algorithms
 import algorithms  # noqa
@@ -28,7 +28,6 @@ class Reduce(Action):
 class Max(Action):
 
     def __init__(self, key_fn, size):
-
         if key_fn is None:
             key_fn = utils.identity
 
@@ -45,6 +44,11 @@ class Max(Action):
         def global_fn(pair1, pair2):
             best_value1, best_items1 = pair1
             best_value2, best_items2 = pair2
+            # a job without elements (e.g. an interrupted one) has no value
+            if best_items1 is None:
+                return pair2
+            if best_items2 is None:
+                return pair1
             if best_value1 == best_value2:
                 if size is None:
                     return (best_value1, best_items1 + best_items2)
@@ -2,10 +2,21 @@
 
 class Atom(object):
 
+    __slots__ = ("parent", "index", "key")
+
     def __init__(self, parent, index):
         assert index >= 0 and index < parent._size
         self.parent = parent
         self.index = index
+        # Atoms are ordered by this key
+        self.key = (parent.uset_id, index)
+
+    def __getstate__(self):
+        return (self.parent, self.index, self.key)
+
+    def __setstate__(self, state):
+        # parent may not be fully unpickled yet, so the key is not recomputed
+        self.parent, self.index, self.key = state
 
     def __repr__(self):
         return "{}{}".format(self.parent.name, self.index)
@@ -17,7 +28,7 @@ class Set(object):
         if _prepared_items:
             self.items = tuple(items)
         else:
-            self.items = tuple(sorted(items, cmp=compare))
+            self.items = tuple(sorted(items, key=sort_key))
 
     def to_set(self):
         return set(self.items)
@@ -52,7 +63,7 @@ class Map(object):
         if _prepared_items:
             self.items = tuple(items)
         else:
-            self.items = tuple(sorted(items, cmp=compare))
+            self.items = tuple(sorted(items, key=sort_key))
 
     def get(self, key):
         for k, v in self.items:
@@ -84,6 +95,10 @@ class Map(object):
 
 
 stype_table = (Atom, int, str, tuple, Map, Set, bool, type(None))
+stype_ranks = dict((t, i) for i, t in enumerate(stype_table))
+
+# Types without atoms inside
+_plain_types = (int, str, bool, type(None))
 
 
 def is_equal(item1, item2):
@@ -107,34 +122,20 @@ def compare(item1, item2):
     type1 = type(item1)
     type2 = type(item2)
 
-    if type1 != type2:
-        try:
-            i1 = stype_table.index(type1)
-        except ValueError:
-            i1 = type1
-        try:
-            i2 = stype_table.index(type2)
-        except ValueError:
-            i2 = type2
+    if type1 is not type2:
+        return cmp(stype_ranks.get(type1, type1),
+                   stype_ranks.get(type2, type2))
 
-        return cmp(i1, i2)
-
-    if type1 == Atom:
-        if item1.parent == item2.parent:
-            return cmp(item1.index, item2.index)
-        else:
-            return cmp(item1.parent.uset_id, item2.parent.uset_id)
+    if type1 is Atom:
+        return cmp(item1.key, item2.key)
 
-    if type1 == tuple:
+    if type1 is tuple:
         return compare_sequence(item1, item2)
 
-    if type1 == int or type2 == str or type1 == bool:
+    if type1 is int or type1 is str or type1 is bool:
         return cmp(item1, item2)
 
-    if type1 == Map:
-        return compare_sequence(item1.items, item2.items)
-
-    if type1 == Set:
+    if type1 is Map or type1 is Set:
         return compare_sequence(item1.items, item2.items)
 
     if item1 is None:
@@ -160,35 +161,25 @@ def compare2(item1, perm1, item2, perm2):
     type1 = type(item1)
     type2 = type(item2)
 
-    if type1 != type2:
+    if type1 is not type2:
         try:
-            return cmp(stype_table.index(type1), stype_table.index(type1))
-        except ValueError:
+            return cmp(stype_ranks[type1], stype_ranks[type2])
+        except KeyError:
             raise Exception("Non-basic type comparison: {} {}".format(
                 repr(item1), repr(item2)))
 
-    if type1 == Atom:
-        item1 = perm1.get(item1, item1)
-        item2 = perm2.get(item2, item2)
-        if item1.parent == item2.parent:
-            return cmp(item1.index, item2.index)
-        else:
-            return cmp(item1.parent.uset_id, item2.parent.uset_id)
+    if type1 is Atom:
+        return cmp(perm1.get(item1, item1).key, perm2.get(item2, item2).key)
 
-    if type1 == tuple:
+    if type1 is tuple:
         return compare2_sequence(item1, perm1, item2, perm2)
 
-    if type1 == int or type1 == str or type1 == bool:
+    if type1 is int or type1 is str or type1 is bool:
         return cmp(item1, item2)
 
-    if type1 == Map or type1 == Set:
-        items1 = list(item1.items)
-        if perm1:
-            items1.sort(cmp=lambda i1, i2: compare2(i1, perm1, i2, perm1))
-        items2 = list(item2.items)
-        if perm2:
-            items2.sort(cmp=lambda i1, i2: compare2(i1, perm2, i2, perm2))
-        return compare2_sequence(items1, perm1, items2, perm2)
+    if type1 is Map or type1 is Set:
+        return cmp(permuted_sort_key(item1, perm1),
+                   permuted_sort_key(item2, perm2))
 
     if item1 is None:
         return 0
@@ -196,11 +187,66 @@ def compare2(item1, perm1, item2, perm2):
     raise Exception("Unknown type " + repr(type1) + " value: " + repr(item1))
 
 
+def sort_key(item):
+    """Returns a key of item for sorting.
+
+    Keys are nested tuples that are natively comparable and their ordering
+    is the same as the ordering defined by :func:`compare`.
+    """
+    t = type(item)
+    if t is Atom:
+        return 0, item.key
+    if t is tuple:
+        return 3, len(item), tuple(sort_key(i) for i in item)
+    if t is Map or t is Set:
+        items = item.items
+        return stype_ranks[t], len(items), tuple(sort_key(i) for i in items)
+    return stype_ranks.get(t, t), item
+
+
+def permuted_sort_key(item, perm):
+    """Returns the sort key of item with atoms replaced by ``perm``"""
+    if not perm:
+        return sort_key(item)
+    t = type(item)
+    if t is Atom:
+        return 0, perm.get(item, item).key
+    if t is tuple:
+        return 3, len(item), tuple(permuted_sort_key(i, perm) for i in item)
+    if t is Map or t is Set:
+        items = item.items
+        return (stype_ranks[t], len(items),
+                tuple(sorted(permuted_sort_key(i, perm) for i in items)))
+    return stype_ranks.get(t, t), item
+
+
 def sort(items):
-    items.sort(cmp=compare)
+    items.sort(key=sort_key)
+
+
+def is_sorted(items):
+    """Returns True if items are sorted and there are no equal items"""
+    return all(compare(items[i], items[i + 1]) < 0
+               for i in xrange(len(items) - 1))
 
 
 def foreach_atom(item, fn):
+    t = type(item)
+    if t is Atom:
+        fn(item)
+    elif t in _plain_types:
+        return
+    elif t is tuple:
+        for i in item:
+            foreach_atom(i, fn)
+    elif t is Map or t is Set:
+        for i in item.items:
+            foreach_atom(i, fn)
+    else:
+        _foreach_atom_subclass(item, fn)
+
+
+def _foreach_atom_subclass(item, fn):
     if isinstance(item, Atom):
         fn(item)
     elif (isinstance(item, int) or isinstance(item, str) or
@@ -217,6 +263,22 @@ def foreach_atom(item, fn):
 
 
 def replace_atoms(item, fn):
+    t = type(item)
+    if t is Atom:
+        return fn(item)
+    elif t in _plain_types:
+        return item
+    elif t is tuple or t is list:
+        return tuple(replace_atoms(i, fn) for i in item)
+    elif t is Map:
+        return Map(replace_atoms(i, fn) for i in item.items)
+    elif t is Set:
+        return Set(replace_atoms(i, fn) for i in item.items)
+    else:
+        return _replace_atoms_subclass(item, fn)
+
+
+def _replace_atoms_subclass(item, fn):
     if isinstance(item, Atom):
         return fn(item)
     elif (isinstance(item, int) or isinstance(item, str) or
@@ -0,0 +1,100 @@
+import itertools
+
+from .exception import HaydiException
+
+try:
+    import numpy as np
+    numpy_import_error = None
+except ImportError as e:
+    numpy_import_error = e
+
+
+BATCH_SIZE = 4096
+
+# Indices and integer elements of batches have to fit into int64
+MAX_INT = 2 ** 63 - 1
+
+
+def check_numpy():
+    if numpy_import_error:
+        raise HaydiException("Package 'numpy' must be properly installed "
+                             "in order to use batch iteration\n"
+                             "Error:\n{}".format(numpy_import_error))
+
+
+def values_to_array(values):
+    """Returns a NumPy array of values if all of them are booleans or all
+    of them are integers, otherwise returns None"""
+    if numpy_import_error:
+        return None
+    if all(type(v) is bool for v in values):
+        return np.array(values, dtype=bool)
+    if all(type(v) is int for v in values):
+        return np.array(values, dtype=np.int64)
+    return None
+
+
+def range_to_array(start, step, indices):
+    """Returns elements of a range with the given indices"""
+    return indices * step + start
+
+
+def iterate_batches(columns, sizes, step, end, batch_size, flat):
+    """Iterates over elements of a product of columns in mixed-radix order.
+
+    Each column is a function that returns an array of elements for an
+    array of indices; ``sizes`` are numbers of elements of columns. Each
+    yielded batch is 2-D array with one row per element; when columns have
+    different types (e.g. booleans and integers), the batch is an array of
+    Python objects, so elements are the same as in the non-batched
+    iteration. If ``flat`` is True, then there has to be exactly one column
+    and 1-D arrays are yielded instead.
+    """
+    if end > MAX_INT:
+        raise HaydiException("Domain is too big for batch iteration")
+    weights = []
+    w = 1
+    for size in reversed(sizes):
+        weights.append(w)
+        w *= size
+    weights.reverse()
+
+    for start in xrange(step, end, batch_size):
+        indices = np.arange(start, min(start + batch_size, end),
+                            dtype=np.int64)
+        if flat:
+            yield columns[0](indices)
+            continue
+        values = [columns[i]((indices // weights[i]) % sizes[i])
+                  for i in xrange(len(columns))]
+        dtypes = set(v.dtype for v in values)
+        if len(dtypes) == 1:
+            dtype = dtypes.pop()
+        else:
+            dtype = object
+        batch = np.empty((len(indices), len(columns)), dtype=dtype)
+        for i, v in enumerate(values):
+            if dtype is object:
+                v = v.tolist()
+            batch[:, i] = v
+        yield batch
+
+
+def make_batch(items):
+    return np.array(items)
+
+
+def unbatch(batch):
+    """Converts a batch back to a list of Python objects"""
+    if batch.ndim == 1:
+        return batch.tolist()
+    else:
+        return [tuple(row) for row in batch.tolist()]
+
+
+def split_to_chunks(iterator, size):
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
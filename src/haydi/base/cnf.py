@@ -1,17 +1,54 @@
+import collections
 import itertools
-from .basictypes import sort, collect_atoms, compare, replace_atoms, compare2
-
-
-def uset_permutations_bounded(uset_and_bounds):
-    return itertools.product(
-        *(tuple(itertools.permutations(uset.all()[:bound], bound))
-          for uset, bound in uset_and_bounds))
-
-
-def uset_permutations_all(uset_and_bounds):
-    return itertools.product(
-        *(tuple(itertools.permutations(uset.all(), bound))
-          for uset, bound in uset_and_bounds))
+from .basictypes import (sort, collect_atoms, compare, replace_atoms, compare2,
+                         Atom, Map, Set, stype_ranks, atom_index)
+
+
+# Maximal number of permutation tables kept in the cache
+TABLE_CACHE_SIZE = 64
+
+_table_cache = collections.OrderedDict()
+
+
+def get_permutation_table(shape):
+    """Returns a table of non-identity permutations for the given shape.
+
+    Shape is a tuple of pairs ``(bound, size)``; each permutation maps
+    indices ``0 .. bound - 1`` of a group to distinct indices
+    ``0 .. size - 1`` of the same group. Indices of all groups are numbered
+    consecutively and a permutation is stored as a flat tuple of target
+    indices. Tables are cached, least recently used ones are dropped first.
+    """
+    table = _table_cache.pop(shape, None)
+    if table is None:
+        groups = []
+        offset = 0
+        for bound, size in shape:
+            groups.append(tuple(
+                tuple(i + offset for i in p)
+                for p in itertools.permutations(xrange(size), bound)))
+            offset += size
+        table = tuple(sum(p, ()) for p in itertools.product(*groups))
+        table = table[1:]  # Remove identity
+        if len(_table_cache) >= TABLE_CACHE_SIZE:
+            _table_cache.popitem(last=False)
+    _table_cache[shape] = table
+    return table
+
+
+def _make_permutations(usets_and_bounds, all_targets):
+    sources = []
+    targets = []
+    shape = []
+    for uset, bound in usets_and_bounds:
+        atoms = uset.all()
+        size = len(atoms) if all_targets else bound
+        sources.extend(atoms[:bound])
+        targets.extend(atoms[:size])
+        shape.append((bound, size))
+    get_target = targets.__getitem__
+    return [dict(itertools.izip(sources, itertools.imap(get_target, row)))
+            for row in get_permutation_table(tuple(shape))]
 
 
 def apply_permutation(item, perm):
@@ -23,35 +60,11 @@ def apply_permutation_with_gaps(item, perm):
 
 
 def make_permutations_all(usets_and_bounds):
-    permutations = []
-    usets = [uset for uset, bound in usets_and_bounds]
-    it = uset_permutations_all(usets_and_bounds)
-    next(it)  # Remove identity
-    for perm in it:
-        result = {}
-        for i in xrange(len(usets)):
-            a = usets[i].all()
-            p = perm[i]
-            for j in xrange(len(p)):
-                result[a[j]] = p[j]
-        permutations.append(result)
-    return permutations
+    return _make_permutations(usets_and_bounds, True)
 
 
 def make_permutations_bounded(usets_and_bounds):
-    permutations = []
-    usets = [uset for uset, bound in usets_and_bounds]
-    it = uset_permutations_bounded(usets_and_bounds)
-    next(it)  # Remove identity
-    for perm in it:
-        result = {}
-        for i in xrange(len(usets)):
-            a = usets[i].all()
-            p = perm[i]
-            for j in xrange(len(p)):
-                result[a[j]] = p[j]
-        permutations.append(result)
-    return permutations
+    return _make_permutations(usets_and_bounds, False)
 
 
 def get_bounds(item, original_bounds=None):
@@ -107,7 +120,13 @@ def remove_gaps(item):
 
 def canonize(item, use_remove_gaps=True):
     if use_remove_gaps:
+        if _canonize_cache is not None:
+            return _canonize_cache.canonize(item)
         item = remove_gaps(item)
+    return _canonize_without_gaps(item)
+
+
+def _canonize_without_gaps(item):
     bound_dict = get_bounds(item)
     perm = {}
     for p in make_permutations_bounded(bound_dict.items()):
@@ -129,17 +148,177 @@ def is_canonical_naive(item):
     return True
 
 
+# Bounds with at most this number of permutations are checked by comparing
+# the item with all permuted items; bigger ones use the pruned search
+SEARCH_THRESHOLD = 24
+
+
+def count_bounded_permutations(bound_dict):
+    count = 1
+    for bound in bound_dict.itervalues():
+        for i in xrange(2, bound + 1):
+            count *= i
+    return count
+
+
 def is_canonical(item):
     # TODO: This is version for internal purpose
     # where we know that there are no gaps in permutations
     # for public version we would need similar operation
     # as in canonize
     bound_dict = get_bounds(item)
-    empty = {}
-    for p in make_permutations_bounded(bound_dict.items()):
-        if compare2(item, empty, item, p) > 0:
-            return False
-    return True
+    if count_bounded_permutations(bound_dict) <= SEARCH_THRESHOLD:
+        empty = {}
+        for p in make_permutations_bounded(bound_dict.items()):
+            if compare2(item, empty, item, p) > 0:
+                return False
+        return True
+    return _is_canonical_search(item, bound_dict)
+
+
+class _Unknown(object):
+    """Image of an atom that is not assigned by a partial permutation yet"""
+
+    __slots__ = ("atom",)
+
+    def __init__(self, atom):
+        self.atom = atom
+
+
+class _Unsorted(object):
+    """Permuted Set or Map whose items are not sorted yet"""
+
+    __slots__ = ("cls", "items")
+
+    def __init__(self, cls, items):
+        self.cls = cls
+        self.items = items
+
+
+def _is_canonical_search(item, bound_dict):
+    """Checks canonicity of item by a search over bounded permutations.
+
+    A permutation is built from its inverse: images are assigned
+    in the increasing order, hence an atom without an assigned image is mapped
+    to an atom greater than all assigned images. This allows to compare the
+    item with its permuted variant before the permutation is completed;
+    once the result is the same for all completions, the whole subtree of
+    permutations is skipped.
+    """
+    if not bound_dict:
+        return True
+    # small usets first, they are fully assigned after a few steps
+    usets = sorted(bound_dict.iteritems(),
+                   key=lambda x: (x[1], x[0].uset_id))
+    images = {}
+    counts = {}
+
+    def search(u, free):
+        uset, bound = usets[u]
+        k = counts.get(uset, 0)
+        image = uset.get(k)
+        counts[uset] = k + 1
+        for atom in free:
+            images[atom] = image
+            c = _compare_partial(item, _permute(item, images), counts)
+            if c > 0:
+                return False
+            if c is None:
+                if k + 1 < bound:
+                    found = search(u, [a for a in free if a is not atom])
+                else:
+                    found = search(u + 1, _bounded_atoms(usets[u + 1]))
+                if not found:
+                    return False
+            del images[atom]
+        counts[uset] = k
+        return True
+
+    return search(0, _bounded_atoms(usets[0]))
+
+
+def _bounded_atoms(uset_and_bound):
+    uset, bound = uset_and_bound
+    return uset.all()[:bound]
+
+
+def _permute(item, images):
+    t = type(item)
+    if t is Atom:
+        image = images.get(item)
+        if image is None:
+            return _Unknown(item)
+        return image
+    if t is tuple:
+        return tuple(_permute(i, images) for i in item)
+    if t is Map or t is Set:
+        return _Unsorted(t, [_permute(i, images) for i in item.items])
+    return item
+
+
+def _compare_partial(item, permuted, counts):
+    """Compares item with its permuted variant where the permutation may be
+    partial.
+
+    Returns None if the result depends on images that are not assigned yet.
+    """
+    t = type(item)
+    t2 = type(permuted)
+    if t2 is _Unknown:
+        t2 = Atom
+    elif t2 is _Unsorted:
+        t2 = permuted.cls
+
+    if t is not t2:
+        # items of a set may have different types
+        return cmp(stype_ranks[t], stype_ranks[t2])
+
+    if t is Atom:
+        if type(permuted) is _Unknown:
+            parent = permuted.atom.parent
+            if item.parent is not parent:
+                return cmp(item.parent.uset_id, parent.uset_id)
+            # unknown image is greater than all assigned images
+            if item.index < counts.get(parent, 0):
+                return -1
+            return None
+        return compare(item, permuted)
+
+    if t is tuple:
+        if len(item) != len(permuted):
+            return cmp(len(item), len(permuted))
+        for i in xrange(len(item)):
+            c = _compare_partial(item[i], permuted[i], counts)
+            if c != 0:
+                return c
+        return 0
+
+    if t is Map or t is Set:
+        # sets and maps are ordered by their size first
+        if len(item.items) != len(permuted.items):
+            return cmp(len(item.items), len(permuted.items))
+        remaining = list(permuted.items)
+        for i in item.items:
+            # Items of the permuted variant are not sorted;
+            # i has to be compared with all candidates for the same position
+            equal = None
+            undecided = False
+            for j in xrange(len(remaining)):
+                c = _compare_partial(i, remaining[j], counts)
+                if c == 1:
+                    return 1
+                if c == 0:
+                    equal = j
+                elif c is None:
+                    undecided = True
+            if undecided:
+                return None
+            if equal is None:
+                return -1
+            del remaining[equal]
+        return 0
+
+    return compare(item, permuted)
 
 
 def create_candidate_permutations(item, bounds):
@@ -198,18 +377,286 @@ def canonical_builder(domain, item, make_fn, extra_bounds):
                         yield result
 
 
+def iterate_builder(builder):
+    """Iterates over all canonical forms of a builder.
+
+    Builder is a tuple ``(initial, domain, item, make_fn, extra_bounds)``
+    where ``initial`` are elements yielded before the search tree and the
+    rest are arguments of :func:`canonical_builder`.
+    """
+    initial, domain, item, make_fn, extra_bounds = builder
+    return itertools.chain(
+        initial, canonical_builder(domain, item, make_fn, extra_bounds))
+
+
+def iterate_split_units(builder, depth):
+    """Iterates over units of work of the builder's search tree cut
+    at the given depth.
+
+    A unit is a node in the depth ``depth`` (together with its subtree) or a
+    final node above this depth. Units are yielded as tuples returned by
+    ``make_fn`` in the order of :func:`iterate_builder`.
+    """
+    initial, domain, item, make_fn, extra_bounds = builder
+    for element in initial:
+        yield element, None, True, None
+    for unit in _iterate_units(domain, item, make_fn, extra_bounds, depth):
+        yield unit
+
+
+def _iterate_units(domain, item, make_fn, extra_bounds, depth):
+    bounds = get_bounds(item, extra_bounds)
+    for base_item in domain.create_cn_iter():
+        for candidate in create_candidates(base_item, bounds):
+            unit = make_fn(item, candidate)
+            result, next_domain, is_final, new_bounds = unit
+            if result is None or not is_canonical(result):
+                continue
+            if depth <= 1 or not next_domain:
+                yield unit
+                continue
+            if is_final:
+                yield result, None, True, None
+            for unit in _iterate_units(
+                    next_domain, result, make_fn, new_bounds, depth - 1):
+                yield unit
+
+
+def iterate_split_builder(builder, depth, start, end, guard=None):
+    """Iterates over canonical forms of units in range [start, end)
+    (see :func:`iterate_split_units`)
+
+    If ``guard`` is not ``None``, then ``guard.should_stop()`` is called
+    before each unit and ``guard.count`` is set to the number of finished
+    units.
+    """
+    make_fn = builder[3]
+    units = itertools.islice(iterate_split_units(builder, depth), start, end)
+    count = 0
+    for result, next_domain, is_final, new_bounds in units:
+        if guard is not None:
+            guard.count = count
+            if guard.should_stop():
+                return
+        if is_final:
+            yield result
+        if next_domain:
+            for result in canonical_builder(
+                    next_domain, result, make_fn, new_bounds):
+                yield result
+        count += 1
+    if guard is not None:
+        guard.count = count
+
+
 def expand(item, use_remove_gaps=True):
-    if use_remove_gaps:
-        item = remove_gaps(item)
-    items = [apply_permutation(item, p)
-             for p in make_permutations_all(get_bounds(item).items())]
-    items.append(item)
+    items = list(iter_expand(item, use_remove_gaps))
     sort(items)
-    unique(items)
     return items
 
 
+def iter_expand(item, use_remove_gaps=True):
+    """Iterates over all items isomorphic to a given item (including
+    the item itself).
+
+    Each isomorphic item is produced exactly once. Unlike :func:`expand`,
+    items are not sorted and they are not kept in memory.
+    """
+    if use_remove_gaps:
+        item = remove_gaps(item)
+
+    sources, targets, shape = _group_atoms(item)
+    get_target = targets.__getitem__
+    stabilizer = _compute_stabilizer(item, sources, shape)
+
+    # Two maps p, q create the same item iff q = p * s for some s from the
+    # stabilizer. Only the lexicographically smallest map of each such class
+    # is used.
+    for row in _iterate_permutation_rows(shape, 0):
+        get_index = row.__getitem__
+        if all(tuple(itertools.imap(get_index, s)) > row
+               for s in stabilizer):
+            yield apply_permutation(item, dict(itertools.izip(
+                sources, itertools.imap(get_target, row))))
+
+
+def orbit_size(item):
+    """Returns the number of items isomorphic to a given item (including
+    the item itself).
+
+    The result is equal to ``len(expand(item))``, but isomorphic items are
+    not created; it is computed as the size of the permutation group
+    divided by the size of the stabilizer of the item.
+    """
+    sources, targets, shape = _group_atoms(item)
+    group_size = 1
+    for bound, size in shape:
+        for i in xrange(size - bound + 1, size + 1):
+            group_size *= i
+    stabilizer = _compute_stabilizer(item, sources, shape)
+    return group_size // (len(stabilizer) + 1)
+
+
+def _with_orbit_size(item):
+    return (item, orbit_size(item))
+
+
+def _group_atoms(item):
+    """Returns atoms present in the item (sorted and grouped by usets),
+    all atoms of these usets and the shape of the permutation table
+    that maps the former to the latter."""
+    groups = {}
+    for atom in collect_atoms(item):
+        groups.setdefault(atom.parent, set()).add(atom)
+    sources = []
+    targets = []
+    shape = []
+    for uset, atoms in groups.iteritems():
+        sources.extend(sorted(atoms, key=atom_index))
+        targets.extend(uset.all())
+        shape.append((len(atoms), len(uset.all())))
+    return sources, targets, shape
+
+
+def _compute_stabilizer(item, sources, shape):
+    """Returns rows of the permutation table of atoms present in the item
+    that map the item to itself (except the identity)"""
+    stabilizer = []
+    empty = {}
+    for row in get_permutation_table(tuple((n, n) for n, size in shape)):
+        perm = dict(itertools.izip(
+            sources, itertools.imap(sources.__getitem__, row)))
+        if compare2(item, empty, item, perm) == 0:
+            stabilizer.append(row)
+    return stabilizer
+
+
+def _iterate_permutation_rows(shape, offset):
+    """Lazily iterates over rows of a permutation table (including the
+    identity), see :func:`get_permutation_table`"""
+    if not shape:
+        yield ()
+        return
+    bound, size = shape[0]
+    for p in itertools.permutations(xrange(offset, offset + size), bound):
+        for rest in _iterate_permutation_rows(shape[1:], offset + size):
+            yield p + rest
+
+
 def is_isomorphic(item1, item2):
     if type(item1) != type(item2):
         return False
     return canonize(item1) == canonize(item2)
+
+
+class CanonizeCache(object):
+    """Cache of canonical forms.
+
+    The cache remembers canonical forms of canonized items (and canonical
+    forms themselves), so canonizing the same item again is only a dictionary
+    lookup. When the cache is full, the least recently used item is removed.
+
+    The cache may be used directly in a pipeline::
+
+        >>> cache = hd.CanonizeCache()
+        >>> domain.map(cache.canonize)  # doctest: +SKIP
+
+    or it can be set for the whole process by :func:`set_canonize_cache`.
+
+    Args:
+        max_size (int): Maximal number of remembered items
+    """
+
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self.forms = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def canonize(self, item):
+        forms = self.forms
+        form = forms.pop(item, _missing)
+        if form is not _missing:
+            self.hits += 1
+            forms[item] = form
+            return form
+
+        self.misses += 1
+        form = _canonize_without_gaps(remove_gaps(item))
+        self._put(item, form)
+        if form != item:
+            self._put(form, form)
+        return form
+
+    def is_isomorphic(self, item1, item2):
+        if type(item1) != type(item2):
+            return False
+        return self.canonize(item1) == self.canonize(item2)
+
+    def clear(self):
+        self.forms.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _put(self, item, form):
+        forms = self.forms
+        forms.pop(item, None)
+        if len(forms) >= self.max_size:
+            forms.popitem(last=False)
+        forms[item] = form
+
+    def __len__(self):
+        return len(self.forms)
+
+    def __repr__(self):
+        return "<CanonizeCache size={} hits={} misses={}>".format(
+            len(self.forms), self.hits, self.misses)
+
+
+_canonize_cache = None
+
+# Marker for items that are not in the cache
+_missing = object()
+
+
+def set_canonize_cache(cache):
+    """Sets a cache used by :func:`canonize` and :func:`is_isomorphic` in
+    the current process.
+
+    Args:
+        cache (CanonizeCache or None): The cache; ``None`` disables caching
+    """
+    global _canonize_cache
+    _canonize_cache = cache
+
+
+def isomorphism_classes(iterable, cache=None):
+    """Divides items into classes of isomorphic items.
+
+    Items are consumed one by one and only the classes are kept in memory.
+    It returns an ordered dictionary where keys are canonical forms and values
+    are lists of items (in the order of ``iterable``); classes are ordered by
+    their first item.
+
+    Args:
+        iterable: Items to be divided
+        cache (CanonizeCache or None): A cache for canonization; if ``None``
+            then the cache set by :func:`set_canonize_cache` is used (if
+            any)
+
+    Example:
+
+        >>> a0, a1, a2 = hd.USet(3, "a")
+        >>> hd.isomorphism_classes([(a0, a1), (a0, a0), (a2, a1)])
+        OrderedDict([((a0, a1), [(a0, a1), (a2, a1)]), ((a0, a0), [(a0, a0)])])
+    """
+    canonize_fn = cache.canonize if cache is not None else canonize
+    classes = collections.OrderedDict()
+    for item in iterable:
+        form = canonize_fn(item)
+        items = classes.get(form)
+        if items is None:
+            classes[form] = [item]
+        else:
+            items.append(item)
+    return classes
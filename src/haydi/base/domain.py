@@ -1,4 +1,8 @@
+import itertools
+
 import utils
+import batch
+import cnf
 from copy import copy
 
 
@@ -23,6 +27,7 @@ class Domain(object):
     filtered = False
     step_jumps = False
     strict = False
+    vectorizable = False
 
     def __init__(self, name=None):
         self._name = name
@@ -84,6 +89,49 @@ class Domain(object):
     def __pow__(self, exponent):
         return Sequences(self, exponent)
 
+    def unrank(self, index):
+        """Returns the element at the given index
+
+        Indices correspond to the order of elements in ``create_iter()``.
+        It is also available as ``domain[index]``. Negative indices are
+        counted from the end of domain.
+
+        It is supported only for non-filtered domains with a known size.
+
+        Examples:
+
+            >>> p = hd.Range(3) * hd.Values(("a", "b"))
+            >>> p.unrank(3)
+            (1, 'b')
+            >>> p[-1]
+            (2, 'b')
+        """
+        self._check_ranking()
+        size = self.size
+        if index < 0:
+            index += size
+        if index < 0 or index >= size:
+            raise IndexError("Index out of range")
+        return self._unrank(index)
+
+    def rank(self, element):
+        """Returns the index of the element in the domain
+
+        It is the inverse function of :meth:`unrank`.
+        ValueError is raised when the element is not in the domain.
+
+        Example:
+
+            >>> p = hd.Range(3) * hd.Values(("a", "b"))
+            >>> p.rank((1, "b"))
+            3
+        """
+        self._check_ranking()
+        return self._rank(element)
+
+    def __getitem__(self, index):
+        return self.unrank(index)
+
     def iterate_steps(self, start, end):
         """Create iterator over a given range of steps
 
@@ -113,6 +161,27 @@ class Domain(object):
 
     # Internal
 
+    def _check_ranking(self):
+        if self.filtered or self.size is None:
+            raise Exception("Ranking is supported only on non-filtered "
+                            "domains with a known size; domain '{}'"
+                            .format(self.name))
+
+    def _unrank(self, index):
+        """Returns the element at the given index
+
+        Each domain that supports ranking should override this method.
+        The index is already checked to be in range.
+        """
+        raise NotImplementedError()
+
+    def _rank(self, element):
+        """Returns the index of the element
+
+        Each domain that supports ranking should override this method.
+        """
+        raise NotImplementedError()
+
     def _set_flags_from_domain(self, domain):
         self.filtered = domain.filtered
         self.step_jumps = domain.step_jumps
@@ -204,6 +273,10 @@ class Domain(object):
         """A shortcut for ``self.collect().run(ctx, timeout)``"""
         return self.collect().run(ctx, timeout)
 
+    def stream(self, ctx=None, timeout=None, ordered=True, max_pending=None):
+        """A shortcut for ``self.collect().stream(...)``"""
+        return self.collect().stream(ctx, timeout, ordered, max_pending)
+
     # Shortcuts
     # def take(self, count):
     #     return transform.iterate().take(count)
@@ -226,6 +299,97 @@ class Domain(object):
     def create_iter(self, step=0):
         return self._make_iter(step)
 
+    def create_batch_iter(self, step=0, batch_size=batch.BATCH_SIZE,
+                          end=None):
+        """Creates an iterator over batches of elements as NumPy arrays
+
+        Each batch contains at most ``batch_size`` elements; elements are in
+        the same order as in ``create_iter()``. A domain of numbers yields
+        1-D arrays, a product (or sequences) of such domains yields 2-D arrays
+        with one row per element.
+
+        It is supported only for non-filtered products and sequences of
+        :class:`haydi.Range`, :class:`haydi.Boolean` and
+        :class:`haydi.Values` that contain only integers.
+
+        Args:
+            step (int): Index of the first element
+            batch_size (int): Maximal number of elements in one batch
+            end (int or None): Index where the iteration stops, if ``None``
+                then the iteration goes to the end of domain
+
+        Example:
+
+            >>> list(hd.Range(5).create_batch_iter(batch_size=3))
+            [array([0, 1, 2]), array([3, 4])]
+        """
+        batch.check_numpy()
+        if not self.supports_batch_iter():
+            raise Exception("Domain {} does not support batch iteration"
+                            .format(self.name))
+        if end is None or end > self.size:
+            end = self.size
+        return self._make_batch_iter(step, batch_size, end)
+
+    def supports_batch_iter(self):
+        """Returns True if ``create_batch_iter()`` can be used"""
+        return self.vectorizable and self.size <= batch.MAX_INT
+
+    def _batch_values(self, indices):
+        """Returns elements with the given indices as 1-D NumPy array
+
+        Each domain with ``vectorizable`` flag has to override this method.
+        """
+        raise NotImplementedError()
+
+    def _make_batch_iter(self, step, batch_size, end):
+        return batch.iterate_batches(
+            (self._batch_values,), (self.size,), step, end, batch_size, True)
+
+    def _get_cn_builder(self):
+        """Returns a builder of canonical forms (see
+        :func:`haydi.base.cnf.iterate_builder`) or None if the domain does
+        not build canonical forms through a search tree"""
+        return None
+
+    def supports_cn_split(self):
+        """Returns True if the search tree of canonical forms can be split
+        into independent units of work"""
+        return self._get_cn_builder() is not None
+
+    def get_cn_split_size(self, depth):
+        """Returns the number of units of work when the search tree of
+        canonical forms is cut at the given depth"""
+        builder = self._get_cn_builder()
+        if builder is None:
+            return sum(1 for _ in self.create_cn_iter())
+        return sum(1 for _ in cnf.iterate_split_units(builder, depth))
+
+    def create_cn_split_iter(self, depth, start=0, end=None, guard=None):
+        """Iterates over canonical forms from a part of the search tree
+
+        The search tree of canonical forms is cut at the given depth. Nodes
+        in this depth (with their subtrees) and final nodes above it are units
+        of work numbered in the order of ``create_cn_iter()``. Only canonical
+        forms from units with indices in range [start, end) are produced.
+
+        Args:
+            depth (int): Depth where the tree is cut
+            start (int): Index of the first unit
+            end (int or None): Index where the iteration stops, if ``None``
+                then the iteration goes to the last unit
+            guard (JobGuard or None): Guard of a job that may stop the
+                iteration between units; the number of finished units is
+                stored in the guard
+        """
+        builder = self._get_cn_builder()
+        if builder is None:
+            units = itertools.islice(self.create_cn_iter(), start, end)
+            if guard is not None:
+                units = guard.iterate(units)
+            return units
+        return cnf.iterate_split_builder(builder, depth, start, end, guard)
+
     def create_skip_iter(self, step=0):
         if self.filtered:
             return self._make_skip_iter(step)
@@ -270,7 +434,7 @@ class Domain(object):
         else:
             return pipeline.take(count)
 
-    def cnfs(self):
+    def cnfs(self, split_depth=None):
         """Create a pipeline iterating over canonical elements in the domain
 
         The method returns instance of :class:`haydi.Pipeline` with "cnfs"
@@ -278,8 +442,29 @@ class Domain(object):
 
         This works only for *strict* domains. If called on a non-strict domain,
         then an exception is thrown.
+
+        Args:
+            split_depth (int or None): Depth where the search tree of
+                canonical forms is split into jobs when the pipeline runs in
+                a parallel context. If ``None`` then the depth is chosen
+                automatically.
+        """
+        pipeline = self._make_pipeline("cnfs")
+        pipeline.split_depth = split_depth
+        return pipeline
+
+    def cnfs_weighted(self, split_depth=None):
+        """Create a pipeline iterating over canonical elements with weights
+
+        The same as :meth:`cnfs`, but elements of the pipeline are pairs
+        ``(item, weight)``, where ``weight`` is the number of elements of
+        the domain isomorphic to ``item`` (see :func:`haydi.orbit_size`).
+        The sum of all weights is the size of the domain.
+
+        Args:
+            split_depth (int or None): See :meth:`cnfs`
         """
-        return self._make_pipeline("cnfs")
+        return self.cnfs(split_depth).map(cnf._with_orbit_size)
 
     def to_values(self, max_size=None):
         """Materialize the domain (or its subdomains)
@@ -11,7 +11,7 @@ class Join(Domain):
         self._set_flags_from_domains(domains)
         self.domains = domains
         self.ratios = ratios
-        self.ratio_sums = None
+        self._ratio_sums = None
 
     def _compute_size(self):
         size = 0
@@ -46,6 +46,38 @@ class Join(Domain):
                 yield v
             index += 1
 
+    def _make_skip_iter(self, step):
+        if step >= self.size:
+            return
+
+        index = 0
+        while step >= self.domains[index].size:
+            step -= self.domains[index].size
+            index += 1
+
+        while index < len(self.domains):
+            it = self.domains[index].create_skip_iter(step)
+            step = 0
+            for v in it:
+                yield v
+            index += 1
+
+    def _unrank(self, index):
+        for d in self.domains:
+            size = d.size
+            if index < size:
+                return d._unrank(index)
+            index -= size
+
+    def _rank(self, element):
+        offset = 0
+        for d in self.domains:
+            try:
+                return offset + d._rank(element)
+            except ValueError:
+                offset += d.size
+        raise ValueError("{} is not in domain".format(element))
+
     def _compute_ratio_sums(self):
         ratios = self.ratios
         if ratios is None:
@@ -56,15 +88,15 @@ class Join(Domain):
         for r in ratios:
             s += r
             ratio_sums.append(s)
-        self.ratio_sums = ratio_sums
+        self._ratio_sums = ratio_sums
 
     def generate_one(self):
-        ratio_sums = self.ratio_sums
+        ratio_sums = self._ratio_sums
         if ratio_sums is None:
             self._compute_ratio_sums()
-            ratio_sums = self.ratio_sums
-        c = randint(0, self.ratio_sums[-1] - 1)
-        for i, r in enumerate(self.ratio_sums):
+            ratio_sums = self._ratio_sums
+        c = randint(0, self._ratio_sums[-1] - 1)
+        for i, r in enumerate(self._ratio_sums):
             if c < r:
                 return self.domains[i].generate_one()
         assert 0
@@ -1,7 +1,7 @@
-from .domain import Domain
+from .domain import Domain, StepSkip
 from .domain import Product
-from .basictypes import Map, compare
-from .cnf import canonical_builder, get_bounds
+from .basictypes import Map, sort_key, is_sorted
+from .cnf import iterate_builder, get_bounds
 
 
 class Mappings(Domain):
@@ -13,7 +13,7 @@ class Mappings(Domain):
                  name=None):
         keys_size = key_domain.size
         if key_domain.filtered or keys_size is None:
-            keys = tuple(sorted(key_domain, cmp=compare))
+            keys = tuple(sorted(key_domain, key=sort_key))
             keys_size = len(keys)
         else:
             keys = None
@@ -26,30 +26,68 @@ class Mappings(Domain):
         self.map_class = map_class
         if map_class is not Map and map_class is not tuple:
             self.strict = False
-        self.keys = keys
+        self._keys = keys
 
     def _compute_size(self):
         return self.product.size
 
-    def _make_iter(self, step):
-        keys = self.keys
+    def _get_keys(self):
+        keys = self._keys
         if keys is None:
-            keys = tuple(sorted(self.key_domain, cmp=compare))
-            self.keys = keys
+            keys = tuple(sorted(self.key_domain, key=sort_key))
+            self._keys = keys
+        return keys
+
+    def _get_map_factory(self):
+        # Keys are sorted, hence items do not have to be sorted again
+        if self.map_class is Map and is_sorted(self._get_keys()):
+            return _make_prepared_map
+        return self.map_class
 
-        map_class = self.map_class
+    def _make_iter(self, step):
+        keys = self._get_keys()
+        map_class = self._get_map_factory()
         for values in self.product.create_iter(step):
             yield map_class(zip(keys, values))
 
+    def _make_skip_iter(self, step):
+        keys = self._get_keys()
+        map_class = self._get_map_factory()
+        for values in self.product.create_skip_iter(step):
+            if isinstance(values, StepSkip):
+                yield values
+            else:
+                yield map_class(zip(keys, values))
+
     def generate_one(self):
         return Map(zip(self.key_domain, self.product.generate_one()))
 
+    def _unrank(self, index):
+        return self.map_class(zip(self._get_keys(),
+                                  self.product._unrank(index)))
+
+    def _rank(self, element):
+        if isinstance(element, Map):
+            items = element.items
+        elif isinstance(element, tuple):
+            items = element
+        else:
+            items = element.items()
+        values = dict(items)
+        keys = self._get_keys()
+        if len(values) != len(keys):
+            raise ValueError("{} is not in domain".format(element))
+        try:
+            values = tuple(values[key] for key in keys)
+        except KeyError:
+            raise ValueError("{} is not in domain".format(element))
+        return self.product._rank(values)
+
     def create_cn_iter(self):
-        keys = self.keys
-        if keys is None:
-            keys = tuple(sorted(self.key_domain, cmp=compare))
-            self.keys = keys
+        return iterate_builder(self._get_cn_builder())
 
+    def _get_cn_builder(self):
+        keys = self._get_keys()
         value_domain = self.value_domain
 
         def make_fn(map_item, candidate):
@@ -59,11 +97,14 @@ class Mappings(Domain):
             if len(new_items) == len(keys):
                 return m, None, True, None
             return m, value_domain, False, get_bounds(keys[len(new_items)])
-        return canonical_builder(
-            value_domain, Map(()), make_fn, get_bounds(keys[0]))
+        return (), value_domain, Map(()), make_fn, get_bounds(keys[0])
 
     def _remap_domains(self, transformation):
         return Mappings(transformation(self.key_domain),
                         transformation(self.value_domain),
                         self.map_class,
                         self.name)
+
+
+def _make_prepared_map(items):
+    return Map(items, True)
@@ -1,4 +1,4 @@
-from .domain import Domain
+from .domain import Domain, StepSkip
 
 from math import factorial
 import itertools
@@ -10,19 +10,81 @@ class Permutations(Domain):
     def __init__(self, domain, name=None):
         super(Permutations, self).__init__(name)
         self._set_flags_from_domain(domain)
-        self.step_jumps = False  # not implemented yet
         self.domain = domain
 
     def _compute_size(self):
         return factorial(self.domain.size)
 
-    def create_iter(self, step=0):
-        assert step == 0  # nonzero step implemented yet
+    def _make_iter(self, step):
+        return iterate_permutations(tuple(self.domain), step)
+
+    def _make_skip_iter(self, step):
+        # Only permutations of non-filtered elements are valid; they
+        # are placed at the beginning and the rest is skipped
         items = tuple(self.domain)
-        return itertools.permutations(items)
+        for item in iterate_permutations(items, step):
+            yield item
+        rest = self.size - max(step, factorial(len(items)))
+        if rest > 0:
+            yield StepSkip(rest)
+
+    def _unrank(self, index):
+        # Lehmer code; the order is the same as in itertools.permutations
+        domain = self.domain
+        pool = range(domain.size)
+        result = []
+        for i in xrange(len(pool), 0, -1):
+            j, index = divmod(index, factorial(i - 1))
+            result.append(domain._unrank(pool.pop(j)))
+        return tuple(result)
+
+    def _rank(self, element):
+        domain = self.domain
+        size = domain.size
+        if not isinstance(element, tuple) or len(element) != size:
+            raise ValueError("{} is not in domain".format(element))
+        pool = range(size)
+        index = 0
+        for i, value in enumerate(element):
+            j = pool.index(domain._rank(value))
+            index += j * factorial(size - i - 1)
+            pool.pop(j)
+        return index
 
     def generate_one(self):
         return random.shuffle(tuple(self.domain))
 
     def _remap_domains(self, transformation):
         return Permutations(transformation(self.domain), self.name)
+
+
+def iterate_permutations(items, step):
+    """Iterates permutations of items in the order of itertools.permutations
+    starting at the given index"""
+    if step == 0:
+        return itertools.permutations(items)
+    if step >= factorial(len(items)):
+        return iter(())
+    digits = []
+    for i in xrange(len(items), 0, -1):
+        digit, step = divmod(step, factorial(i - 1))
+        digits.append(digit)
+    return _iterate_permutations_from((), list(items), digits)
+
+
+def _iterate_permutations_from(prefix, pool, digits):
+    if not any(digits):
+        for p in itertools.permutations(pool):
+            yield prefix + p
+        return
+
+    digit = digits[0]
+    for i in xrange(digit, len(pool)):
+        rest = pool[:i] + pool[i + 1:]
+        item = prefix + (pool[i],)
+        if i == digit:
+            it = _iterate_permutations_from(item, rest, digits[1:])
+        else:
+            it = (item + p for p in itertools.permutations(rest))
+        for p in it:
+            yield p
@@ -1,8 +1,10 @@
 
 from copy import copy
 
+from .exception import HaydiException
 from .runtime.serialcontext import SerialContext
 from . import action
+from . import batch
 
 
 class Pipeline(object):
@@ -41,6 +43,7 @@ class Pipeline(object):
         self.method = method
         self.transformations = ()
         self.take_count = None
+        self.split_depth = None
 
     def __iter__(self):
         """Run the domain and iterate over the result.
@@ -161,7 +164,7 @@ class Pipeline(object):
         pipeline.transformations += (transformation,)
         return pipeline
 
-    def run(self, ctx=None, timeout=None, otf_trace=False):
+    def run(self, ctx=None, timeout=None, otf_trace=False, **ctx_args):
         """
         Run the pipeline
 
@@ -170,13 +173,49 @@ class Pipeline(object):
                 If ``None`` then the serial context is used.
             timeout(float or timedelta): Time limit for the computation.
             otf_trace(bool): Write tracing log in OTF format.
+            ctx_args: Additional arguments of the context
+                (e.g. ``resume`` or ``policy`` of
+                :meth:`haydi.DistributedContext.run`).
         """
         if not ctx:
             ctx = SerialContext()
 
-        result = ctx.run(self, timeout, otf_trace)
+        result = ctx.run(self, timeout, otf_trace, **ctx_args)
         return self.action.postprocess(result)
 
+    def stream(self, ctx=None, timeout=None, ordered=True, max_pending=None):
+        """
+        Run the pipeline and iterate over elements as they are computed
+
+        Unlike :meth:`run`, elements are yielded as soon as their jobs
+        finish; therefore, the whole result is never kept in memory. Only
+        pipelines with the :meth:`collect` action can be streamed.
+
+        Args:
+            ctx(haydi.Context or None): Context of execution.
+                If ``None`` then the serial context is used.
+            timeout(float or timedelta): Time limit for the computation.
+            ordered(bool): If ``True`` then elements are yielded in the order
+                of iteration, otherwise in the order in which jobs finish.
+            max_pending(int or None): Maximal number of jobs that are
+                computed or wait for the consumer; the computation is paused
+                when the consumer is slow. If ``None`` then the context
+                chooses the limit.
+
+        Examples:
+
+        >>> ctx = hd.ParallelContext(processes=4)
+        >>> for x in hd.Range(10).map(lambda x: x * x).stream(ctx):
+        ...     print x
+        """
+        if (self.action.worker_reduce_fn is not None or
+                self.action.global_reduce_fn is not None):
+            raise HaydiException(
+                "Only pipelines with collect() action can be streamed")
+        if not ctx:
+            ctx = SerialContext()
+        return ctx.stream(self, timeout, ordered, max_pending)
+
     def filter(self, fn, strict=False):
         """Transformation: Filter elements from the pipeline"""
         return self._add_transformation(
@@ -187,6 +226,34 @@ class Pipeline(object):
         return self._add_transformation(
             transform.MapTransformation(fn))
 
+    def filter_batch(self, fn):
+        """Transformation: Filter elements by a vectorized predicate
+
+        The function ``fn`` takes a NumPy array of elements (one row for each
+        element of a product) and returns a boolean mask of kept elements.
+
+        Example:
+
+            >>> p = hd.Range(10) * hd.Range(10)
+            >>> p.iterate().filter_batch(
+            ...     lambda b: b[:, 0] + b[:, 1] == 17).run()
+            [(8, 9), (9, 8)]
+        """
+        batch.check_numpy()
+        return self._add_transformation(
+            transform.BatchFilterTransformation(fn))
+
+    def map_batch(self, fn):
+        """Transformation: Map a vectorized function over elements
+
+        The function ``fn`` takes a NumPy array of elements (one row for each
+        element of a product) and returns an array with one row for
+        each element.
+        """
+        batch.check_numpy()
+        return self._add_transformation(
+            transform.BatchMapTransformation(fn))
+
     def __repr__(self):
         s = "<Pipeline for {}: method={}".format(self.domain.name,
                                                  self.method)
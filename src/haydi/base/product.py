@@ -1,7 +1,8 @@
 
 from .domain import Domain, StepSkip
 from .values import Values
-from .cnf import canonical_builder
+from .cnf import iterate_builder
+from .batch import MAX_INT, iterate_batches
 
 import math
 from collections import namedtuple
@@ -60,13 +61,16 @@ class Product(Domain):
                 raise Exception("Not implemented for discitinct domains")
 
     def create_cn_iter(self):
+        return iterate_builder(self._get_cn_builder())
+
+    def _get_cn_builder(self):
         def make_fn(item, candidate):
             item += (candidate,)
             if len(item) == len(domains):
                 return item, None, True, None
             return item, domains[len(item)], False, None
         domains = self.domains
-        return canonical_builder(domains[0], (), make_fn, None)
+        return (), domains[0], (), make_fn, None
 
     def _make_iter(self, step):
         if self.unordered:
@@ -83,6 +87,47 @@ class Product(Domain):
         else:
             return self._create_product_step_iter(step)
 
+    def _unrank(self, index):
+        if self.unordered:
+            domain = self.domains[0]
+            x, y = self._init_uproduct_iter(index)
+            return (domain._unrank(x), domain._unrank(y))
+
+        values = []
+        for d in reversed(self.domains):
+            index, i = divmod(index, d.size)
+            values.append(d._unrank(i))
+        values.reverse()
+        return tuple(values)
+
+    def _rank(self, element):
+        if (not isinstance(element, tuple) or
+                len(element) != len(self.domains)):
+            raise ValueError("{} is not in domain".format(element))
+
+        if self.unordered:
+            domain = self.domains[0]
+            x = domain._rank(element[0])
+            y = domain._rank(element[1])
+            if x <= y:
+                raise ValueError("{} is not in domain".format(element))
+            steps = domain.size - 1
+            return x - 1 - y - ((y - 1) * y / 2) + y * steps
+
+        index = 0
+        for d, value in zip(self.domains, element):
+            index = index * d.size + d._rank(value)
+        return index
+
+    def supports_batch_iter(self):
+        return (not self.unordered and self.size <= MAX_INT and
+                all(d.vectorizable for d in self.domains))
+
+    def _make_batch_iter(self, step, batch_size, end):
+        columns = [d._batch_values for d in self.domains]
+        sizes = [d.size for d in self.domains]
+        return iterate_batches(columns, sizes, step, end, batch_size, False)
+
     def _init_iters(self, step):
         if step:
             iters = []
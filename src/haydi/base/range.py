@@ -1,5 +1,6 @@
 
 from .domain import Domain
+from .batch import MAX_INT, range_to_array
 
 from random import randint
 
@@ -45,7 +46,7 @@ class Range(Domain):
         <Range size=10 {10, 11, 12, 13, ...}>
 
         >>> hd.Range(4, 15, 3)  # From 4 upto 15, step 3
-        <Range size=3 {4, 7, 10}>
+        <Range size=4 {4, 7, 10, 13}>
 
     """
 
@@ -62,7 +63,7 @@ class Range(Domain):
         if step == 1 and end == 1:
             size = end
         else:
-            size = (end - start) / step
+            size = (end - start + step - 1) / step
         self._size = size
         self.start = start
         self.end = end
@@ -77,5 +78,23 @@ class Range(Domain):
     def _make_iter(self, step):
         return iter(xrange(self.start + step * self.step, self.end, self.step))
 
+    def _unrank(self, index):
+        return self.start + index * self.step
+
+    def _rank(self, element):
+        if not isinstance(element, (int, long)):
+            raise ValueError("{} is not in domain".format(element))
+        index, r = divmod(element - self.start, self.step)
+        if r != 0 or index < 0 or index >= self.size:
+            raise ValueError("{} is not in domain".format(element))
+        return index
+
+    @property
+    def vectorizable(self):
+        return -MAX_INT <= self.start and self.end <= MAX_INT
+
+    def _batch_values(self, indices):
+        return range_to_array(self.start, self.step, indices)
+
     def create_cn_iter(self):
         return self.create_iter()
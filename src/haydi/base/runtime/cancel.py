@@ -0,0 +1,75 @@
+import threading
+import uuid
+
+from .util import haydi_logger
+
+
+class CancelFlag(object):
+    """
+    Flag that signals workers to stop the computation of their jobs.
+
+    This is a local variant shared by threads of one process.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+
+    def set(self):
+        self.event.set()
+
+    def is_set(self):
+        return self.event.is_set()
+
+    def close(self):
+        pass
+
+
+class DistributedCancelFlag(object):
+    """
+    Cancellation flag stored in metadata of the ``distributed`` scheduler.
+
+    The flag is pickled only by its name; workers read it through their
+    worker client. A flag that was removed by :meth:`close` is read as set,
+    because its run is over.
+    """
+
+    def __init__(self, client):
+        self.name = "haydi-cancel-{}".format(uuid.uuid4().hex)
+        self.client = client
+        self.client.set_metadata(self.name, False)
+
+    def set(self):
+        self.client.set_metadata(self.name, True)
+
+    def is_set(self):
+        try:
+            return self._get_client().get_metadata(self.name, default=True)
+        except Exception as e:
+            haydi_logger.warning("Cancel flag cannot be read: {}".format(e))
+            return False
+
+    def close(self):
+        """Removes the flag from the scheduler"""
+        try:
+            self.client.run_on_scheduler(_remove_metadata, self.name)
+        except Exception as e:
+            haydi_logger.warning("Cancel flag cannot be removed: {}"
+                                 .format(e))
+
+    def _get_client(self):
+        if self.client is None:
+            from distributed.worker import get_client
+
+            self.client = get_client()
+        return self.client
+
+    def __getstate__(self):
+        return self.name
+
+    def __setstate__(self, name):
+        self.name = name
+        self.client = None
+
+
+def _remove_metadata(name, dask_scheduler=None):
+    dask_scheduler.task_metadata.pop(name, None)
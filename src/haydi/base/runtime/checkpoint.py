@@ -0,0 +1,189 @@
+import cPickle
+import hashlib
+import os
+import re
+import types
+
+from haydi.base.domain import Domain
+from haydi.base.exception import HaydiException
+
+
+class Checkpoint(object):
+    """
+    Append-only log of finished jobs stored in a directory.
+
+    The log starts with a header that describes the run, each finished job
+    (with its partial result) is appended as a separate record. A record
+    that was not completely written (e.g. when the process was killed) is
+    ignored and it is overwritten by the next record.
+    """
+
+    log_name = "jobs.log"
+    version = 2
+
+    def __init__(self, path):
+        """
+        :type path: str
+        :param path: checkpoint directory
+        """
+        self.path = path
+        self.log_path = os.path.join(path, self.log_name)
+        self.file = None
+
+    def exists(self):
+        return os.path.isfile(self.log_path)
+
+    def create(self, header):
+        """Creates a new log; an existing log is not overwritten
+
+        :type header: dict
+        """
+        if self.exists():
+            raise HaydiException(
+                "Checkpoint '{}' already exists; resume the run from it or "
+                "remove it".format(self.path))
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        self.file = open(self.log_path, "wb")
+        self._write(dict(header, version=self.version))
+
+    def resume(self, header):
+        """Loads finished jobs and opens the log for appending new ones
+
+        :type header: dict
+        :param header: header of the current run, it has to be the same as
+            the header of the stored run
+        :rtype: list of haydi.base.runtime.job.Job
+        """
+        if not self.exists():
+            raise HaydiException(
+                "Checkpoint '{}' does not exist".format(self.path))
+        jobs = []
+        with open(self.log_path, "rb") as f:
+            try:
+                stored_header = cPickle.load(f)
+            except Exception:
+                raise HaydiException(
+                    "Checkpoint '{}' is corrupted".format(self.path))
+            if stored_header != dict(header, version=self.version):
+                raise HaydiException(
+                    "Checkpoint '{}' belongs to a different run ({})"
+                    .format(self.path, stored_header))
+            end = f.tell()
+            while True:
+                try:
+                    jobs.append(cPickle.load(f))
+                except Exception:
+                    break
+                end = f.tell()
+
+        self.file = open(self.log_path, "r+b")
+        self.file.seek(end)
+        self.file.truncate()
+        return jobs
+
+    def write_job(self, job):
+        self._write(job)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def _write(self, obj):
+        cPickle.dump(obj, self.file, cPickle.HIGHEST_PROTOCOL)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+
+def create_header(pipeline, size, split_depth=None):
+    """Returns the header of a run; a checkpoint can be resumed only by
+    a run with the same header
+
+    ``split_depth`` is the split depth of units used by the run (for the
+    "cnfs" method), indices of jobs depend on it.
+    """
+    return {"method": pipeline.method,
+            "size": size,
+            "split_depth": split_depth,
+            "fingerprint": get_pipeline_fingerprint(pipeline)}
+
+
+def get_pipeline_fingerprint(pipeline):
+    """Returns a hash of the domain, the action (with its parameters),
+    the take count and the transformations of the pipeline
+
+    Domains are described by their classes and parameters. Functions are
+    described by their code, constants and closures, so the fingerprint
+    does not depend on the process that created the pipeline.
+    """
+    parts = [_describe_domain(pipeline.domain), str(pipeline.take_count)]
+    action = pipeline.action
+    if action is not None:
+        parts.append(_describe(action))
+    for tr in pipeline.transformations:
+        parts.append(_describe(tr))
+    return hashlib.sha1("\n".join(parts)).hexdigest()
+
+
+def _describe_domain(domain):
+    # private attributes are caches (e.g. the size) that are computed lazily
+    attrs = sorted((key, value) for key, value in vars(domain).items()
+                   if not key.startswith("_"))
+    return "{}({}, {})".format(
+        domain.__class__.__name__, domain.name,
+        ", ".join("{}={}".format(key, _describe_value(value))
+                  for key, value in attrs))
+
+
+def _describe_value(value):
+    if isinstance(value, Domain):
+        return _describe_domain(value)
+    if isinstance(value, (tuple, list)):
+        return "[{}]".format(", ".join(_describe_value(v) for v in value))
+    return _describe(value, 1)
+
+
+def _describe(obj, depth=0):
+    # the depth limits recursive closures and large captured objects
+    if depth < 4:
+        if isinstance(obj, types.FunctionType):
+            closure = obj.func_closure or ()
+            return "fn({}, {}, [{}])".format(
+                obj.__name__, _describe_code(obj.func_code),
+                ", ".join(_describe(cell.cell_contents, depth + 1)
+                          for cell in closure))
+        if hasattr(obj, "__dict__") and not isinstance(obj, type):
+            attrs = sorted(vars(obj).items())
+            return "{}({})".format(
+                obj.__class__.__name__,
+                ", ".join("{}={}".format(key, _describe(value, depth + 1))
+                          for key, value in attrs))
+    # addresses of objects differ in each process
+    return re.sub(r" at 0x[0-9a-fA-F]+", "", repr(obj))
+
+
+def _describe_code(code):
+    consts = []
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            consts.append(_describe_code(const))
+        else:
+            consts.append(repr(const))
+    return "code({!r}, {}, [{}])".format(
+        code.co_code, code.co_names, ", ".join(consts))
+
+
+def get_completed_ranges(jobs):
+    """Returns sorted and merged index ranges ``(start, end)`` covered by
+    the jobs; parts of interrupted jobs that were not processed are not
+    covered"""
+    ranges = []
+    for job in sorted(jobs, key=lambda job: job.start_index):
+        start = job.start_index
+        end = job.last_index
+        if ranges and ranges[-1][1] >= start:
+            ranges[-1] = (ranges[-1][0], max(ranges[-1][1], end))
+        else:
+            ranges.append((start, end))
+    return ranges
@@ -0,0 +1,65 @@
+class CostModel(object):
+    """
+    Predicts the time needed to process elements of a domain.
+
+    The cost (seconds per element) is measured on finished jobs and it is
+    tracked by an exponentially weighted moving average, globally and
+    separately for regions of indices. The cost of a region that was not
+    measured yet is predicted by the global average, which is dominated by
+    the most recent jobs.
+    """
+
+    # Durations shorter than this are considered to be a noise
+    min_duration = 0.001
+
+    def __init__(self, size=None, region_count=64, alpha=0.3):
+        """
+        :type size: int | None
+        :param size: size of the domain; if it is ``None`` then only the
+            global average is used
+        :type region_count: int
+        :type alpha: float
+        :param alpha: weight of a new measurement
+        """
+        if size:
+            self.region_size = max(1, size // region_count)
+        else:
+            self.region_size = None
+        self.alpha = alpha
+        self.cost = None
+        self.region_costs = {}
+
+    def add_job(self, start, size, duration):
+        """Records a finished job of ``size`` elements starting at index
+        ``start`` that took ``duration`` seconds"""
+        if size <= 0:
+            return
+        cost = max(duration, self.min_duration) / float(size)
+        self.cost = self._update(self.cost, cost)
+        if self.region_size:
+            region = (start + size // 2) // self.region_size
+            self.region_costs[region] = self._update(
+                self.region_costs.get(region), cost)
+
+    def predict_cost(self, index):
+        """Returns the predicted cost of the element at ``index`` or ``None``
+        if there are no measurements yet"""
+        if self.region_size:
+            cost = self.region_costs.get(index // self.region_size)
+            if cost is not None:
+                return cost
+        return self.cost
+
+    def get_job_size(self, start, duration):
+        """Returns the number of elements starting at ``start`` that are
+        expected to be processed in ``duration`` seconds (or ``None`` if
+        there are no measurements yet)"""
+        cost = self.predict_cost(start)
+        if cost is None:
+            return None
+        return max(1, int(duration / cost))
+
+    def _update(self, value, measurement):
+        if value is None:
+            return measurement
+        return self.alpha * measurement + (1 - self.alpha) * value
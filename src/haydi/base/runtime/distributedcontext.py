@@ -1,6 +1,5 @@
 from __future__ import print_function
 
-import itertools
 import os
 import socket
 import time
@@ -12,10 +11,13 @@ from haydi.base.exception import HaydiException, TimeoutException
 try:
     from distributed import Client, LocalCluster
 
-    from .strategy import StepStrategy, PrecomputeStrategy, GeneratorStrategy
+    from .strategy import create_strategy
     from .trace import OTFTracer, Tracer
 
+    from .cancel import DistributedCancelFlag
+    from .checkpoint import Checkpoint, create_header, get_completed_ranges
     from .scheduler import JobScheduler
+    from .job import ReorderBuffer, ResultCollector, iterate_job_items
     from .util import haydi_logger, ProgressLogger, TimeoutManager
 
     package_import_error = None
@@ -43,15 +45,6 @@ def get_worker_count(executor):
     return workers
 
 
-def create_strategy(pipeline, timeout=None):
-    if pipeline.method == "generate":
-        return GeneratorStrategy(pipeline, timeout)
-    elif pipeline.method == "iterate" and pipeline.domain.step_jumps:
-        return StepStrategy(pipeline, timeout)
-    else:
-        return PrecomputeStrategy(pipeline, timeout)
-
-
 class DistributedContext(object):
     """
     Parallel context that uses the
@@ -63,7 +56,11 @@ class DistributedContext(object):
     process with one thread.
 
     Partial results can be saved to disk during the computation
-    to avoid losing all results if the program ends abruptly.
+    to avoid losing all results if the program ends abruptly. When
+    ``checkpoint_dir`` is set, each finished job (with its partial result)
+    is appended to a log in this directory. An interrupted run can be
+    continued by ``run(pipeline, resume=checkpoint_dir)``; already computed
+    index ranges are skipped and new jobs are appended to the same log.
 
     Args:
         ip (string): IP address of a distributed cluster
@@ -73,12 +70,22 @@ class DistributedContext(object):
                 - connect to an existing cluster located at (ip, port)
             - If `spawn_workers` is ``n``
                 - create a local cluster with ``n`` workers
+        checkpoint_dir (string or None): Directory where finished jobs are
+            stored; it must not contain a checkpoint of another run
+        policy (SchedulingPolicy or None): Default policy of scheduling
+            jobs; if ``None`` then :class:`haydi.ThroughputPolicy` is used
     """
 
+    # Maximal time (in seconds) to wait for the scheduling thread at the end
+    # of a run
+    scheduler_join_timeout = 10
+
     def __init__(self,
                  ip="127.0.0.1",
                  port=8787,
-                 spawn_workers=0):
+                 spawn_workers=0,
+                 checkpoint_dir=None,
+                 policy=None):
         """
 
         :type ip: string
@@ -94,6 +101,8 @@ class DistributedContext(object):
         self.worker_count = spawn_workers
         self.ip = ip
         self.port = port
+        self.checkpoint_dir = checkpoint_dir
+        self.policy = policy
         self.active = False
 
         if spawn_workers > 0:
@@ -109,8 +118,91 @@ class DistributedContext(object):
     def run(self,
             pipeline,
             timeout=None,
-            otf_trace=False):
+            otf_trace=False,
+            resume=None,
+            policy=None):
+        """
+        Args:
+            resume (string or None): Checkpoint directory of an interrupted
+                run of the same pipeline; finished jobs are loaded from it
+                and only the remaining work is computed
+            policy (SchedulingPolicy or None): Policy of scheduling jobs for
+                this run; if ``None`` then the policy of the context is used
+        """
+        tracer, worker_count, strategy = self._prepare_run(
+            pipeline, timeout, otf_trace)
+
+        checkpoint, jobs = self._open_checkpoint(pipeline, strategy, resume)
+        cancel_flag = DistributedCancelFlag(self.executor)
+
+        scheduler = JobScheduler(self.executor,
+                                 worker_count,
+                                 strategy,
+                                 timeout,
+                                 tracer,
+                                 get_completed_ranges(jobs),
+                                 policy=policy or self.policy,
+                                 cancel_flag=cancel_flag)
+
+        scheduler.add_resumed_jobs(jobs)
+        collector = ResultCollector(pipeline)
+        for job in jobs:
+            collector.add(job)
+
+        try:
+            self._run_computation(scheduler, timeout, checkpoint, collector)
+        finally:
+            self._close_cancel_flag(scheduler, cancel_flag)
+            if checkpoint:
+                checkpoint.close()
+
+        haydi_logger.info("Size of domain: {}".format(pipeline.domain.size))
+        tracer.trace_finish()
 
+        return collector.get_result()
+
+    def stream(self, pipeline, timeout=None, ordered=True, max_pending=None):
+        """Iterates over elements of a collect pipeline as jobs finish
+
+        Jobs are scheduled by the policy of the context.
+
+        Args:
+            ordered (bool): If ``True`` then elements are yielded in the
+                order of iteration; jobs that finish early wait in a reorder
+                buffer.
+            max_pending (int or None): Maximal number of jobs that are
+                running or whose results wait for the consumer. If ``None``
+                then twice the normal backlog of the scheduler is used.
+        """
+        tracer, worker_count, strategy = self._prepare_run(
+            pipeline, timeout, False)
+        cancel_flag = DistributedCancelFlag(self.executor)
+
+        scheduler = JobScheduler(self.executor,
+                                 worker_count,
+                                 strategy,
+                                 timeout,
+                                 tracer,
+                                 policy=self.policy,
+                                 cancel_flag=cancel_flag)
+        if max_pending is None:
+            max_pending = 2 * worker_count * scheduler.backlog_per_worker
+        scheduler.max_pending = max_pending
+
+        scheduler.start()
+        try:
+            jobs = self._iterate_finished_jobs(scheduler, timeout)
+            if ordered:
+                jobs = self._reorder_jobs(jobs)
+            for item in iterate_job_items(pipeline, jobs,
+                                          scheduler.release_job):
+                yield item
+        finally:
+            scheduler.stop()
+            self._close_cancel_flag(scheduler, cancel_flag)
+            tracer.trace_finish()
+
+    def _prepare_run(self, pipeline, timeout, otf_trace):
         if otf_trace:
             tracer = OTFTracer("otf-{}".format(int(time.time())))
         else:
@@ -126,73 +218,56 @@ class DistributedContext(object):
         start_msg = "Starting run with size {} and worker count {} on {}". \
             format(size, worker_count, name)
         haydi_logger.info(start_msg)
+        return tracer, worker_count, strategy
 
-        scheduler = JobScheduler(self.executor,
-                                 worker_count,
-                                 strategy,
-                                 timeout,
-                                 tracer)
-
-        jobs = self._run_computation(scheduler, timeout)
-        results = [job.result for job in jobs]
+    def _close_cancel_flag(self, scheduler, cancel_flag):
+        # the flag is removed when no more jobs are scheduled; jobs that
+        # are still running read a removed flag as set
+        scheduler.join(self.scheduler_join_timeout)
+        cancel_flag.close()
 
-        action = pipeline.action
-
-        if action.worker_reduce_fn is None:
-            results = list(itertools.chain.from_iterable(results))
-
-        if pipeline.take_count:
-            results = results[:pipeline.take_count]
-
-        haydi_logger.info("Size of domain: {}".format(pipeline.domain.size))
-        tracer.trace_finish()
-
-        if action.global_reduce_fn is None or len(results) == 0:
-            return results
+    def _reorder_jobs(self, jobs):
+        buffer = ReorderBuffer()
+        for job in jobs:
+            for ready_job in buffer.push(job):
+                yield ready_job
+        for job in buffer.flush():
+            yield job
+
+    def _open_checkpoint(self, pipeline, strategy, resume):
+        """Returns the checkpoint of the run (or None) and jobs that were
+        already finished"""
+        path = resume or self.checkpoint_dir
+        if path is None:
+            return None, []
+
+        checkpoint = Checkpoint(path)
+        header = create_header(pipeline, strategy.size,
+                               getattr(strategy, "split_depth", None))
+        if resume:
+            jobs = checkpoint.resume(header)
+            haydi_logger.info("Resuming from checkpoint {} ({} jobs)"
+                              .format(path, len(jobs)))
         else:
-            if action.global_reduce_init is None:
-                return reduce(action.global_reduce_fn, results)
-            else:
-                return reduce(action.global_reduce_fn, results,
-                              action.global_reduce_init())
+            checkpoint.create(header)
+            jobs = []
+        return checkpoint, jobs
 
-    def _run_computation(self, scheduler, timeout):
+    def _run_computation(self, scheduler, timeout, checkpoint, collector):
         progress_logger = ProgressLogger(timedelta(seconds=10))
         jobs = []
-        timeout_mgr = TimeoutManager(timeout) if timeout else None
-
-        def consume_job():
-            job = scheduler.job_queue.get(block=False)
-            jobs.append(job)
-            progress_logger.handle_job(scheduler, job)
-
-        def is_timeouted():
-            return timeout_mgr and timeout_mgr.is_finished()
 
         scheduler.start()
 
         try:
-            while not (scheduler.completed or scheduler.canceled):
-                if is_timeouted():
-                    raise TimeoutException()
-
-                try:
-                    consume_job()
-                except Empty:
-                    time.sleep(3)
-
-            # extract remaining jobs
-            while True:
-                try:
-                    consume_job()
-                except Empty:
-                    break
-
+            for job in self._iterate_finished_jobs(scheduler, timeout):
+                jobs.append(job)
+                if checkpoint:
+                    checkpoint.write_job(job)
+                collector.add(job)
+                progress_logger.handle_job(scheduler, job)
         except KeyboardInterrupt:
             pass
-        except TimeoutException:
-            haydi_logger.info("Run timeouted after {} seconds".format(
-                timeout_mgr.get_time_from_start()))
 
         scheduler.stop()
 
@@ -203,11 +278,45 @@ class DistributedContext(object):
 
         return jobs
 
+    def _iterate_finished_jobs(self, scheduler, timeout):
+        """Yields jobs from the scheduler as they finish until all jobs are
+        finished or the time runs out"""
+        timeout_mgr = TimeoutManager(timeout) if timeout else None
+
+        try:
+            while True:
+                # The wait is bounded, so that the master stays responsive
+                # to KeyboardInterrupt
+                wait = scheduler.policy.poll_interval
+                if timeout_mgr:
+                    remaining = timeout_mgr.get_remaining_time()
+                    if remaining <= 0:
+                        raise TimeoutException()
+                    wait = min(wait, remaining)
+
+                try:
+                    job = scheduler.job_queue.get(timeout=wait)
+                except Empty:
+                    continue
+                if job is None:
+                    # the scheduler has finished, all jobs were consumed
+                    break
+                yield job
+
+        except TimeoutException:
+            haydi_logger.info("Run timeouted after {} seconds".format(
+                timeout_mgr.get_time_from_start()))
+
     def _log_statistics(self, scheduler, jobs):
         haydi_logger.info("Total scheduled: {}".format(
             scheduler.index_scheduled))
         haydi_logger.info("Total completed: {}".format(
             scheduler.index_completed))
+        if scheduler.gaps:
+            haydi_logger.info("Not processed: {} elements in {} gaps of "
+                              "interrupted jobs".format(
+                                  scheduler.index_uncovered,
+                                  len(scheduler.gaps)))
 
         size_hist = {}
         for job in jobs:
@@ -1,3 +1,6 @@
+import itertools
+import time
+
 from .util import TimeoutManager
 
 
@@ -9,23 +12,118 @@ def iterate_with_timeout(iterator, timeout):
             return
 
 
+# How often (in seconds) a cancel flag is read during an iteration
+CANCEL_CHECK_INTERVAL = 1.0
+
+
+class JobGuard(object):
+    """
+    Stops the computation of a job when ``time.time()`` reaches ``end_time``
+    (if not ``None``) or when ``cancel_flag`` (if not ``None``) is set.
+
+    The guard is checked before each element (or batch) is taken from the
+    source of the job, so the check does not depend on transformations;
+    the first element is always taken, so each job makes a progress.
+    ``count`` is the number of indices (elements, or units of canonical
+    forms) that were taken; it is ``None`` if the progress is not tracked.
+    """
+
+    def __init__(self, job, end_time=None, cancel_flag=None):
+        self.job = job
+        self.end_time = end_time
+        self.cancel_flag = cancel_flag
+        self.next_check = time.time()
+        self.count = None
+        self.started = False
+
+    def should_stop(self):
+        if not self.started:
+            self.started = True
+            return False
+        now = time.time()
+        if self.end_time is not None and now > self.end_time:
+            self.job.interrupted = True
+            return True
+        if self.cancel_flag is not None and now >= self.next_check:
+            self.next_check = now + CANCEL_CHECK_INTERVAL
+            if self.cancel_flag.is_set():
+                self.job.interrupted = True
+                return True
+        return False
+
+    def iterate(self, iterator):
+        self.count = 0
+        for item in iterator:
+            if self.should_stop():
+                return
+            self.count += 1
+            yield item
+
+    def iterate_batches(self, batches):
+        self.count = 0
+        for batch in batches:
+            if self.should_stop():
+                return
+            self.count += len(batch)
+            yield batch
+
+
 def generate(domain):
     while True:
         yield domain.generate_one()
 
 
-def iterate_steps(domain, transformations, start, end):
+def iterate_steps(domain, transformations, start, end, guard=None):
+    """Iterates over elements with indices in range [start, end) after
+    transformations; the iteration is stopped by ``guard`` (if not
+    ``None``)"""
+    count = count_batch_transformations(transformations)
+    if count and domain.supports_batch_iter():
+        batches = domain.create_batch_iter(start, end=end)
+        if guard is not None:
+            batches = guard.iterate_batches(batches)
+        it = apply_batch_transformations(batches, transformations[:count])
+        return apply_transformations(it, transformations[count:])
+    return _iterate_skip_steps(domain, transformations, start, end, guard)
+
+
+def _iterate_skip_steps(domain, transformations, start, end, guard):
     from haydi import StepSkip
 
     i = start
-    it = apply_transformations(domain.create_skip_iter(start), transformations)
+    # batch transformations read chunks ahead, so the source is limited
+    # to the range of the job
+    it = apply_skip_transformations(
+        _limit_skip_iter(domain.create_skip_iter(start), end - start),
+        transformations)
     while i < end:
+        if guard is not None:
+            guard.count = i - start
+            if guard.should_stop():
+                return
         v = next(it)
         if isinstance(v, StepSkip):
             i += v.value
         else:
             yield v
             i += 1
+    if guard is not None:
+        guard.count = end - start
+
+
+def _limit_skip_iter(iterator, count):
+    """Yields elements and skips of ``iterator`` that cover the first
+    ``count`` indices"""
+    from haydi import StepSkip
+
+    i = 0
+    while i < count:
+        v = next(iterator)
+        yield v
+        if isinstance(v, StepSkip):
+            i += v.value
+        else:
+            i += 1
 
 
 def apply_transformations(iterator, transformations):
@@ -34,6 +132,51 @@ def apply_transformations(iterator, transformations):
     return iterator
 
 
+def apply_skip_transformations(iterator, transformations):
+    for tr in transformations:
+        iterator = tr.transform_skip_iter(iterator)
+    return iterator
+
+
+def count_batch_transformations(transformations):
+    """Returns the number of leading batch transformations"""
+    from haydi.base.transform import BatchTransformation
+
+    count = 0
+    for tr in transformations:
+        if not isinstance(tr, BatchTransformation):
+            break
+        count += 1
+    return count
+
+
+def apply_batch_transformations(batches, transformations):
+    from haydi.base.batch import unbatch
+
+    for tr in transformations:
+        batches = itertools.imap(tr.transform_batch, batches)
+    return itertools.chain.from_iterable(itertools.imap(unbatch, batches))
+
+
+def make_pipeline_iter(pipeline):
+    """Creates an iterator over elements of the pipeline after
+    transformations.
+
+    If the pipeline starts with batch transformations and its domain supports
+    batches, then they are applied directly on batches from the domain.
+    """
+    domain = pipeline.domain
+    transformations = pipeline.transformations
+    if pipeline.method == "iterate":
+        count = count_batch_transformations(transformations)
+        if count and domain.supports_batch_iter():
+            it = apply_batch_transformations(domain.create_batch_iter(),
+                                             transformations[:count])
+            return apply_transformations(it, transformations[count:])
+    it = make_iter_by_method(domain, pipeline.method)
+    return apply_transformations(it, transformations)
+
+
 def make_iter_by_method(domain, method):
     if method == "iterate":
         it = domain.create_iter()
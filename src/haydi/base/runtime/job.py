@@ -0,0 +1,184 @@
+import heapq
+import itertools
+
+import monotonic
+
+
+class Job(object):
+
+    # True if the job was stopped before it processed all its elements
+    interrupted = False
+    # Number of elements (indices) of the job that were processed;
+    # None if the progress is not tracked
+    processed_count = None
+
+    def __init__(self, worker_id, start_index, size):
+        """
+        :type worker_id: str
+        :type start_index: int
+        :type size: int
+        """
+        self.worker_id = worker_id
+        self.start_index = start_index
+        self.size = size
+        self.result = None
+        self.start_time = monotonic.monotonic()
+        self.end_time = None
+
+    def finish(self, result):
+        self.result = result
+        self.end_time = monotonic.monotonic()
+
+    def get_duration(self):
+        return self.end_time - self.start_time
+
+    @property
+    def last_index(self):
+        """Index behind the last processed element; it is smaller than
+        ``start_index + size`` only if the job was interrupted and its
+        progress is known"""
+        if self.interrupted and self.processed_count is not None:
+            return self.start_index + self.processed_count
+        return self.start_index + self.size
+
+    def __str__(self):
+        return "Job(worker={}, from={}, to={}".format(
+            self.worker_id,
+            self.start_index,
+            self.start_index + self.size)
+
+
+def collect_results(pipeline, jobs):
+    """Composes the final result of a pipeline from finished jobs
+
+    Jobs have to be sorted by their start index.
+    """
+    results = [job.result for job in jobs]
+
+    action = pipeline.action
+
+    if action.worker_reduce_fn is None:
+        results = list(itertools.chain.from_iterable(results))
+
+    if pipeline.take_count:
+        results = results[:pipeline.take_count]
+
+    if action.global_reduce_fn is None or len(results) == 0:
+        return results
+    else:
+        if action.global_reduce_init is None:
+            return reduce(action.global_reduce_fn, results)
+        else:
+            return reduce(action.global_reduce_fn, results,
+                          action.global_reduce_init())
+
+
+def iterate_job_items(pipeline, jobs, release_fn=None):
+    """Yields elements from results of jobs of a collect pipeline
+
+    ``release_fn`` is called when all elements of a job were consumed.
+    The iteration stops after ``take_count`` elements.
+    """
+    count = pipeline.take_count
+    if count == 0:
+        return
+    for job in jobs:
+        result = job.result
+        job.result = None
+        for item in result:
+            yield item
+            if count is not None:
+                count -= 1
+                if count == 0:
+                    return
+        if release_fn:
+            release_fn()
+
+
+class ReorderBuffer(object):
+    """Puts jobs that finish in an arbitrary order back to the order of
+    their indices"""
+
+    def __init__(self):
+        self.pending = []
+        self.next_index = 0
+
+    def __len__(self):
+        return len(self.pending)
+
+    def push(self, job):
+        """Adds a finished job and returns the list of jobs that are ready,
+        i.e. all preceding jobs were already returned"""
+        heapq.heappush(self.pending, (job.start_index, job))
+        ready = []
+        while self.pending and self.pending[0][0] <= self.next_index:
+            job = heapq.heappop(self.pending)[1]
+            ready.append(job)
+            self.next_index = job.last_index
+        return ready
+
+    def flush(self):
+        """Returns all remaining jobs (jobs behind a gap, e.g. when the
+        computation was interrupted)"""
+        jobs = [heapq.heappop(self.pending)[1]
+                for i in xrange(len(self.pending))]
+        return jobs
+
+
+class ResultCollector(object):
+    """Composes the final result of a pipeline from jobs as they finish
+
+    If the action has a global reduce function (and the pipeline is not
+    limited by ``take``), then the result of each job is folded into an
+    accumulator immediately and the job's result is released. Results are
+    folded in the order of indices, so the result does not depend on the
+    order in which jobs finish; jobs that finish out of order wait in
+    a buffer. Otherwise jobs are kept and :func:`collect_results` is used
+    at the end.
+    """
+
+    def __init__(self, pipeline):
+        action = pipeline.action
+        self.pipeline = pipeline
+        self.incremental = (action.global_reduce_fn is not None and
+                            pipeline.take_count is None)
+        self.jobs = []
+        self.buffer = ReorderBuffer()
+        self.empty = True
+        self.value = None
+
+    def add(self, job):
+        if not self.incremental:
+            self.jobs.append(job)
+        else:
+            for job in self.buffer.push(job):
+                self._fold(job)
+
+    def get_result(self):
+        if not self.incremental:
+            self.jobs.sort(key=lambda job: job.start_index)
+            return collect_results(self.pipeline, self.jobs)
+
+        for job in self.buffer.flush():
+            self._fold(job)
+        if self.empty:
+            return []
+        return self.value
+
+    def _fold(self, job):
+        action = self.pipeline.action
+        fn = action.global_reduce_fn
+        if action.worker_reduce_fn is None:
+            values = job.result
+        else:
+            values = (job.result,)
+        job.result = None
+
+        for value in values:
+            if not self.empty:
+                self.value = fn(self.value, value)
+            elif action.global_reduce_init is None:
+                self.value = value
+            else:
+                self.value = fn(action.global_reduce_init(), value)
+            self.empty = False
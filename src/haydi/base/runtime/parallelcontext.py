@@ -0,0 +1,192 @@
+import math
+import multiprocessing
+from collections import deque
+
+from haydi.base.exception import TimeoutException
+
+from .job import ResultCollector, iterate_job_items
+from .strategy import create_strategy
+from .util import haydi_logger, TimeoutManager
+
+
+# Arguments shared by all jobs, set once in each process of the pool
+_worker_args = None
+
+
+def _init_worker(worker_args):
+    global _worker_args
+    _worker_args = worker_args
+
+
+def _run_batch(task):
+    worker_fn, batch = task
+    return worker_fn((_worker_args,) + batch[1:])
+
+
+class ParallelContext(object):
+    """
+    Parallel context that runs the computation in a pool of local processes.
+
+    It uses the same worker strategies as :class:`DistributedContext`, but it
+    needs no distributed cluster; therefore, there is no startup latency
+    of a scheduler and no opened ports.
+
+    The pipeline is sent to processes when the pool is created (by forking);
+    only indices of jobs (or precomputed elements) and results of jobs are
+    pickled.
+
+    Args:
+        processes (int or None): Number of worker processes. If ``None`` then
+            the number of CPUs is used.
+        job_size (int): Maximal number of elements in one job
+        safety_margin (float or None): Processes stop their jobs this many
+            seconds before the timeout of a run; if ``None`` then a tenth of
+            the timeout (at most 60 seconds) is used
+    """
+
+    def __init__(self, processes=None, job_size=1000, safety_margin=None):
+        if processes is None:
+            processes = multiprocessing.cpu_count()
+        self.processes = processes
+        self.job_size = job_size
+        self.safety_margin = safety_margin
+        self.backlog_per_worker = 4
+        # unprocessed ranges (start, end) of interrupted jobs in the last run
+        self.gaps = []
+
+    def run(self, pipeline, timeout=None, otf_trace=False):
+        strategy, pool = self._start_pool(pipeline, timeout)
+        collector = ResultCollector(pipeline)
+        try:
+            for job in self._iterate_jobs(pool, strategy, timeout):
+                collector.add(job)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            pool.terminate()
+            pool.join()
+
+        return collector.get_result()
+
+    def stream(self, pipeline, timeout=None, ordered=True, max_pending=None):
+        """Iterates over elements of a collect pipeline as jobs finish
+
+        Elements are always yielded in the order of iteration (argument
+        ``ordered`` is accepted for compatibility with
+        :class:`DistributedContext`). At most ``max_pending`` jobs are
+        running or waiting for the consumer.
+        """
+        strategy, pool = self._start_pool(pipeline, timeout)
+        backlog = self.processes * self.backlog_per_worker
+        if max_pending is not None:
+            backlog = min(backlog, max_pending)
+        try:
+            jobs = self._iterate_jobs(pool, strategy, timeout, backlog)
+            for item in iterate_job_items(pipeline, jobs):
+                yield item
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def _start_pool(self, pipeline, timeout):
+        strategy = create_strategy(pipeline, timeout)
+
+        haydi_logger.info("Starting run with size {} and process count {}"
+                          .format(strategy.size, self.processes))
+
+        worker_args = strategy.create_cached_args()
+        worker_args["safety_margin"] = strategy.get_safety_margin(
+            self.safety_margin)
+        pool = multiprocessing.Pool(self.processes,
+                                    _init_worker,
+                                    (worker_args,))
+        return strategy, pool
+
+    def _get_job_size(self, size):
+        job_size = self.job_size
+        if size:
+            job_count = self.processes * self.backlog_per_worker
+            job_size = min(job_size, int(math.ceil(size / float(job_count))))
+        return max(job_size, 1)
+
+    def _iterate_jobs(self, pool, strategy, timeout, backlog=None):
+        """Yields finished jobs in the order of their indices"""
+        timeout_mgr = TimeoutManager(timeout) if timeout else None
+        size = strategy.size
+        job_size = self._get_job_size(size)
+        if backlog is None:
+            backlog = self.processes * self.backlog_per_worker
+
+        worker_fn = strategy.create_job(())[0]
+        index_scheduled = 0
+        pending = deque()
+        result_count = 0
+        self.gaps = []
+
+        try:
+            while True:
+                while (len(pending) < backlog and
+                       (not size or index_scheduled < size) and
+                       not strategy.exhausted):
+                    if size:
+                        count = min(job_size, size - index_scheduled)
+                    else:
+                        count = job_size
+                    batch = strategy.get_args_for_batch(
+                        None, index_scheduled, count)
+                    index_scheduled += count
+                    pending.append(pool.apply_async(
+                        _run_batch, ((worker_fn, batch),)))
+
+                if not pending:
+                    break
+
+                if timeout_mgr:
+                    remaining = timeout_mgr.get_remaining_time()
+                    if remaining <= 0:
+                        raise TimeoutException()
+                    job = pending[0].get(remaining)
+                else:
+                    job = pending[0].get()
+                pending.popleft()
+                if job.interrupted:
+                    # the rest of the job goes first, so jobs stay ordered
+                    rest = self._get_job_rest(strategy, job, timeout_mgr)
+                    if rest is not None:
+                        pending.appendleft(pool.apply_async(
+                            _run_batch, ((worker_fn, rest),)))
+                if strategy.result_limit is not None:
+                    result_count += len(job.result)
+                yield job
+                if (strategy.result_limit is not None and
+                        result_count >= strategy.result_limit):
+                    break
+        except (TimeoutException, multiprocessing.TimeoutError):
+            haydi_logger.info("Run timeouted after {} seconds".format(
+                timeout_mgr.get_time_from_start()))
+
+        if self.gaps:
+            haydi_logger.info("Not processed: {} elements in {} gaps of "
+                              "interrupted jobs".format(
+                                  sum(end - start for start, end in self.gaps),
+                                  len(self.gaps)))
+
+    def _get_job_rest(self, strategy, job, timeout_mgr):
+        """Returns the batch with the unprocessed rest of an interrupted job
+        if there is time to compute it, otherwise records the rest as a gap
+        and returns None"""
+        start = job.last_index
+        end = job.start_index + job.size
+        if job.processed_count is None:
+            haydi_logger.warning("{} was interrupted, its progress is "
+                                 "unknown".format(job))
+            return None
+        if start >= end:
+            return None
+        safety_margin = strategy.get_safety_margin(self.safety_margin)
+        if strategy.splittable and (
+                timeout_mgr is None or
+                timeout_mgr.get_remaining_time() > safety_margin):
+            return strategy.get_args_for_batch(None, start, end - start)
+        self.gaps.append((start, end))
+        return None
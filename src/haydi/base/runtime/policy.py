@@ -0,0 +1,129 @@
+import math
+
+
+class SchedulingPolicy(object):
+    """
+    Policy of scheduling jobs in :class:`haydi.DistributedContext`.
+
+    A policy can be passed to the context or to a single run. Custom
+    policies may override :meth:`get_initial_job_size` and
+    :meth:`get_job_size`.
+
+    Args:
+        backlog_per_worker (int): Number of jobs scheduled for each worker
+            in advance
+        target_time (float): Desired duration of one job in seconds
+        initial_job_size (int): Size of first jobs (before any duration is
+            measured)
+        max_growth (float): Maximal factor by which the job size grows in one
+            round of scheduling
+        tail_factor (int or None): Jobs at the end of the domain take at most
+            1 / (tail_factor * worker_count) of the remaining work; ``None``
+            disables splitting of the tail
+        min_job_size (int): Minimal size of a job
+        poll_interval (float): Maximal time (in seconds) that the master
+            waits for a finished job before it checks the state of the run;
+            finished jobs are handled immediately
+        safety_margin (float or None): Workers stop their jobs this many
+            seconds before the timeout of the run, so partial results reach
+            the master in time; if ``None`` then a tenth of the timeout
+            (at most 60 seconds) is used
+    """
+
+    def __init__(self,
+                 backlog_per_worker=4,
+                 target_time=60 * 3,
+                 initial_job_size=200,
+                 max_growth=4,
+                 tail_factor=2,
+                 min_job_size=1,
+                 poll_interval=3,
+                 safety_margin=None):
+        self.backlog_per_worker = backlog_per_worker
+        self.target_time = target_time
+        self.initial_job_size = initial_job_size
+        self.max_growth = max_growth
+        self.tail_factor = tail_factor
+        self.min_job_size = min_job_size
+        self.poll_interval = poll_interval
+        self.safety_margin = safety_margin
+
+    def get_initial_job_size(self, size, job_count):
+        """Returns the size of first ``job_count`` jobs over a domain of
+        ``size`` elements (``size`` may be ``None``)"""
+        job_size = self.initial_job_size
+        if size:
+            job_size = min(job_size, int(math.ceil(size / float(job_count))))
+        return job_size
+
+    def get_job_size(self, cost_model, index, job_size):
+        """Returns the size of a new job that starts at ``index``
+
+        :type cost_model: haydi.base.runtime.costmodel.CostModel
+        :type index: int
+        :type job_size: int
+        :param job_size: size of the largest job of the previous round
+        """
+        size = cost_model.get_job_size(index, self.target_time)
+        if size is None:
+            return job_size
+        return min(size, int(job_size * self.max_growth))
+
+    def __repr__(self):
+        return "<{} target_time={}>".format(self.__class__.__name__,
+                                            self.target_time)
+
+
+class ThroughputPolicy(SchedulingPolicy):
+    """
+    The default policy; long jobs minimize the overhead of scheduling.
+    """
+    pass
+
+
+class LatencyPolicy(SchedulingPolicy):
+    """
+    Policy for short or interactive runs (e.g. ``first()`` or ``take()``);
+    short jobs and frequent polling deliver results quickly.
+    """
+
+    def __init__(self,
+                 backlog_per_worker=2,
+                 target_time=5,
+                 initial_job_size=50,
+                 max_growth=2,
+                 tail_factor=4,
+                 min_job_size=1,
+                 poll_interval=0.1,
+                 safety_margin=1):
+        super(LatencyPolicy, self).__init__(
+            backlog_per_worker, target_time, initial_job_size, max_growth,
+            tail_factor, min_job_size, poll_interval, safety_margin)
+
+
+class FixedSizePolicy(SchedulingPolicy):
+    """
+    Policy with jobs of the same size; boundaries of jobs do not depend on
+    durations of jobs or on the number of workers, hence runs are
+    reproducible.
+    """
+
+    def __init__(self, job_size=1000, backlog_per_worker=4, poll_interval=3,
+                 safety_margin=None):
+        super(FixedSizePolicy, self).__init__(
+            backlog_per_worker=backlog_per_worker,
+            target_time=None,
+            initial_job_size=job_size,
+            tail_factor=None,
+            min_job_size=job_size,
+            poll_interval=poll_interval,
+            safety_margin=safety_margin)
+
+    def get_initial_job_size(self, size, job_count):
+        return self.initial_job_size
+
+    def get_job_size(self, cost_model, index, job_size):
+        return self.initial_job_size
+
+    def __repr__(self):
+        return "<FixedSizePolicy job_size={}>".format(self.initial_job_size)
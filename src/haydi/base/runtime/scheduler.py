@@ -1,42 +1,17 @@
 import Queue
+import heapq
 import math
 import traceback
-from threading import Thread
+from collections import deque
+from threading import Condition, Thread
 
-import monotonic
 from distributed import as_completed
 
+from .costmodel import CostModel
+from .policy import ThroughputPolicy
 from .util import TimeoutManager, haydi_logger
 
 
-class Job(object):
-    def __init__(self, worker_id, start_index, size):
-        """
-        :type worker_id: str
-        :type start_index: int
-        :type size: int
-        """
-        self.worker_id = worker_id
-        self.start_index = start_index
-        self.size = size
-        self.result = None
-        self.start_time = monotonic.monotonic()
-        self.end_time = None
-
-    def finish(self, result):
-        self.result = result
-        self.end_time = monotonic.monotonic()
-
-    def get_duration(self):
-        return self.end_time - self.start_time
-
-    def __str__(self):
-        return "Job(worker={}, from={}, to={}".format(
-            self.worker_id,
-            self.start_index,
-            self.start_index + self.size)
-
-
 class JobScheduler(object):
     """
     Creates computational graphs for distributed and iterates through them.
@@ -47,7 +22,11 @@ class JobScheduler(object):
                  worker_count,
                  strategy,
                  timeout,
-                 tracer):
+                 tracer,
+                 completed_ranges=(),
+                 max_pending=None,
+                 policy=None,
+                 cancel_flag=None):
         """
         :param executor: distributed executor
         :param worker_count: number of workers in the cluster
@@ -55,6 +34,18 @@ class JobScheduler(object):
         :type timeout: datetime.timedelta
         :param timeout: timeout for the computation
         :type tracer: haydi.base.runtime.trace.Tracer
+        :type completed_ranges: list of (int, int)
+        :param completed_ranges: sorted and disjoint index ranges that were
+            already computed (e.g. in a resumed run); they are skipped
+        :type max_pending: int | None
+        :param max_pending: maximal number of jobs that are running or
+            finished and not yet released by :meth:`release_job`;
+            if ``None`` then the number is not limited
+        :type policy: haydi.base.runtime.policy.SchedulingPolicy | None
+        :param policy: if ``None`` then ThroughputPolicy is used
+        :type cancel_flag: haydi.base.runtime.cancel.DistributedCancelFlag
+        :param cancel_flag: flag that is set when the run is stopped;
+            workers check it and stop running jobs
         """
         self.executor = executor
         self.worker_count = worker_count
@@ -62,22 +53,44 @@ class JobScheduler(object):
         self.strategy = strategy
         self.tracer = tracer
         self.index_scheduled = 0
-        self.index_completed = 0
+        self.completed_ranges = deque(completed_ranges)
+        self.index_completed = sum(end - start
+                                   for start, end in completed_ranges)
         self.job_size = None
         self.timeout_mgr = TimeoutManager(timeout) if timeout else None
         self.ordered_futures = []
-        self.backlog_per_worker = 4
-        self.target_time = 60 * 3
-        self.target_time_active = self.target_time
+        self.policy = policy or ThroughputPolicy()
+        self.backlog_per_worker = self.policy.backlog_per_worker
+        self.cost_model = CostModel(self.size)
         self.completed_jobs = []
         self.job_queue = Queue.Queue()
         self.job_thread = None
         self.completed = False
         self.canceled = False
         self.cached_args = None
+        self.max_pending = max_pending
+        self.jobs_running = 0
+        self.jobs_held = 0
+        self.pending_condition = Condition()
+        self.result_limit = strategy.result_limit
+        self.limit_reached = False
+        # (start_index, size, result count) of jobs that finished after
+        # a gap in indices; used for checking the result limit
+        self.prefix_pending = []
+        self.prefix_index = 0
+        self.prefix_count = 0
+        self.cancel_flag = cancel_flag
+        # unprocessed ranges (start, end) of interrupted jobs; requeued
+        # ranges are scheduled again, gaps stay uncovered in this run
+        self.requeued = deque()
+        self.gaps = []
+        self.index_uncovered = 0
 
     def start(self):
         self.cached_args = self.strategy.create_cached_args()
+        self.cached_args["safety_margin"] = self.strategy.get_safety_margin(
+            self.policy.safety_margin)
+        self.cached_args["cancel_flag"] = self.cancel_flag
         self.executor.scatter([self.cached_args], broadcast=True)
 
         self.job_thread = Thread(target=self._iterate_jobs)
@@ -86,7 +99,19 @@ class JobScheduler(object):
 
     def stop(self):
         self.canceled = True
-
+        with self.pending_condition:
+            self.pending_condition.notify()
+        if not self.completed:
+            self._cancel_futures()
+
+    def join(self, timeout=None):
+        """Waits until the thread that schedules jobs is finished"""
+        if self.job_thread is not None:
+            self.job_thread.join(timeout)
+
+    def _cancel_futures(self):
+        if self.cancel_flag is not None:
+            self.cancel_flag.set()
         size = len(self.ordered_futures)
         for i in xrange(size):
             self.ordered_futures[i].cancel()
@@ -97,14 +122,13 @@ class JobScheduler(object):
         time runs out.
         :return: completed job
         """
-        backlog_half = self.backlog_per_worker / 2
+        backlog_half = max(1, self.backlog_per_worker / 2)
         active_futures = self._init_futures(self.backlog_per_worker)
         next_futures = []
 
         try:
-            while ((self._has_more_work() or
-                   self.index_completed < self.index_scheduled) and
-                   not self.canceled):
+            while ((self._has_more_work() or self._has_running_jobs()) and
+                   not self.canceled and not self.limit_reached):
                 iterated = 0
                 for future in as_completed(active_futures):
                     job = future.result()
@@ -113,6 +137,9 @@ class JobScheduler(object):
 
                     self.tracer.trace_job(job)
 
+                    if self.limit_reached:
+                        break
+
                     if iterated >= (backlog_half * self.worker_count):
                         iterated = 0
                         if self._has_more_work():
@@ -123,57 +150,125 @@ class JobScheduler(object):
 
                 active_futures = next_futures
                 next_futures = []
+            if self.limit_reached:
+                haydi_logger.info("Result limit {} reached at index {}"
+                                  .format(self.result_limit,
+                                          self.prefix_index))
+                self._cancel_futures()
         except Exception as e:
             haydi_logger.error(traceback.format_exc(e))
 
         self.completed = True
+        self.job_queue.put(None)  # wakes up the consumer
+
+    def release_job(self):
+        """Marks a finished job as processed by the consumer"""
+        with self.pending_condition:
+            self.jobs_held -= 1
+            self.pending_condition.notify()
+
+    def _get_job_budget(self, job_count):
+        """Returns how many of ``job_count`` jobs can be scheduled without
+        exceeding ``max_pending``.
+
+        When no job is running, it waits until the consumer releases some
+        finished jobs; otherwise it does not block.
+        """
+        if self.max_pending is None:
+            return job_count
+        with self.pending_condition:
+            while True:
+                budget = (self.max_pending - self.jobs_running -
+                          self.jobs_held)
+                if budget > 0 or self.jobs_running > 0 or self.canceled:
+                    return self._clamp(budget, 0, job_count)
+                self.pending_condition.wait(1)
 
     def _schedule(self, count_per_worker):
         """
-        Adjust batch size according to the average duration of recent jobs
-        and create new futures.
+        Create new futures; the size of each job is predicted by the cost
+        model from durations of finished jobs. Requeued ranges are scheduled
+        first and they take from the same budget of jobs.
         :param count_per_worker: how many jobs should be spawned per worker
         :rtype: list of distributed.client.Future
         :return: newly scheduled futures
         """
-        duration = self._get_avg_duration()
-        delta = duration / float(self.target_time_active)
-        delta = self._clamp(delta, 0.5, 1.25)
+        job_count = self._get_job_budget(self.worker_count * count_per_worker)
+        if job_count == 0:
+            return []
+
+        requeued = []
+        while self.requeued and len(requeued) < job_count:
+            requeued.append(self.requeued.popleft())
+        job_count -= len(requeued)
 
         previous_size = self.job_size
-        self.job_size = int(self.job_size / delta)
+        distribution = self._create_job_sizes(job_count)
+        if distribution:
+            self.job_size = max(distribution)
 
         self.tracer.trace_job_size(self.job_size)
 
-        haydi_logger.info("Scheduling: avg duration {}, size {} -> {}"
-                          .format(duration, previous_size, self.job_size))
+        haydi_logger.info(
+            "Scheduling: cost {} s/element, size {} -> {}".format(
+                self.cost_model.predict_cost(self.index_scheduled),
+                previous_size, self.job_size))
 
-        return self._create_futures(self._create_distribution(
-            self.worker_count * count_per_worker, self.job_size))
+        return self._create_futures(distribution, requeued)
 
     def _clamp(self, value, minimum, maximum):
         return min(maximum, max(minimum, value))
 
-    def _get_avg_duration(self):
-        job_histogram = self.completed_jobs[-self.worker_count:]
-        total_duration = sum([j.get_duration() for j in job_histogram])
-        return total_duration / float(len(job_histogram))
+    def add_resumed_jobs(self, jobs):
+        """Counts results of jobs finished in a resumed run towards the
+        result limit (their ranges have to be in ``completed_ranges``)"""
+        if self.result_limit is not None:
+            for job in jobs:
+                self._update_prefix(job)
 
     def _init_futures(self, count_per_worker):
+        if not self._has_more_work():
+            return []
         job_count = self.worker_count * count_per_worker
-        self.job_size = 200
-
-        if self.size:
-            total_size = int(math.ceil(self.size / float(job_count)))
-            if total_size < self.job_size:
-                self.job_size = total_size
-
-        return self._create_futures(self._create_distribution(
-            self.worker_count * count_per_worker, self.job_size))
+        self.job_size = self.policy.get_initial_job_size(self.size, job_count)
+        return self._create_futures(self._create_job_sizes(
+            self._get_job_budget(job_count)))
 
     def _create_distribution(self, job_count, job_size):
         return [job_size] * job_count
 
+    def _create_job_sizes(self, job_count):
+        """Sizes each job by the policy (by default, the predicted duration
+        of a job is the target time).
+
+        When the strategy is splittable, each job takes at most
+        1 / (tail_factor * worker_count) of the remaining work, so the jobs
+        at the end of the domain are getting smaller and no long job is
+        left at the end.
+        """
+        policy = self.policy
+        index = self.index_scheduled
+        remaining = self._get_remaining_work()
+        split_tail = (self.strategy.splittable and self.size and
+                      policy.tail_factor is not None)
+        if split_tail:
+            parts = float(policy.tail_factor * self.worker_count)
+
+        distribution = []
+        for i in xrange(job_count):
+            if self.size and remaining <= 0:
+                break
+            size = policy.get_job_size(self.cost_model, index, self.job_size)
+            if split_tail:
+                size = min(size, int(math.ceil(remaining / parts)))
+            size = max(size, policy.min_job_size)
+            if self.size:
+                size = min(size, remaining)
+                remaining -= size
+            distribution.append(size)
+            index += size
+        return distribution
+
     def _truncate(self, job_distribution):
         """
         :type job_distribution: list of int
@@ -192,45 +287,128 @@ class JobScheduler(object):
 
         return job_distribution
 
-    def _create_futures(self, job_distribution):
+    def _create_futures(self, job_distribution, requeued=()):
         """
         :type job_distribution: list of int
+        :type requeued: list of (int, int)
+        :param requeued: index ranges that are scheduled again
         :return:
         """
-        job_distribution = self._truncate(job_distribution)
         batches = []
+        for start, end in requeued:
+            batches.append(self.strategy.get_args_for_batch(
+                self.cached_args, start, end - start))
+
+        self._skip_completed()
+        if job_distribution:
+            job_distribution = self._truncate(job_distribution)
         for job_size in job_distribution:
+            self._skip_completed()
+            if self.completed_ranges:
+                job_size = min(job_size, self.completed_ranges[0][0] -
+                               self.index_scheduled)
+            if self.size:
+                job_size = min(job_size, self.size - self.index_scheduled)
             if job_size > 0:
                 start = self.index_scheduled
                 batches.append(self.strategy.get_args_for_batch(
                     self.cached_args, start, job_size))
                 self.index_scheduled = start + job_size
+        self._skip_completed()
 
         if len(batches) > 0:
             self.tracer.trace_index_scheduled(self.index_scheduled)
             self.tracer.trace_comment("Sending {} jobs with size {}"
                                       .format(len(batches), self.job_size))
             args = self.strategy.create_job(batches)
+            with self.pending_condition:
+                self.jobs_running += len(batches)
             futures = self.executor.map(args[0], args[1])
             self.ordered_futures += futures
             return futures
         else:
             return []
 
+    def _skip_completed(self):
+        """Moves the scheduled index behind completed ranges that start at
+        it"""
+        while (self.completed_ranges and
+               self.completed_ranges[0][0] <= self.index_scheduled):
+            start, end = self.completed_ranges.popleft()
+            if end > self.index_scheduled:
+                self.strategy.skip(self.index_scheduled,
+                                   end - self.index_scheduled)
+                self.index_scheduled = end
+
     def _mark_job_completed(self, job):
+        with self.pending_condition:
+            self.jobs_running -= 1
+            self.jobs_held += 1
         self.completed_jobs.append(job)
-        self.index_completed += job.size
+        processed = job.last_index - job.start_index
+        self.index_completed += processed
+        if not job.interrupted or job.processed_count is not None:
+            self.cost_model.add_job(job.start_index, processed,
+                                    job.get_duration())
+        if job.interrupted:
+            self._handle_interrupted(job)
+        if self.result_limit is not None:
+            self._update_prefix(job)
 
         self.tracer.trace_index_completed(self.index_completed)
 
         self.job_queue.put(job)
 
+    def _handle_interrupted(self, job):
+        """Requeues the unprocessed rest of an interrupted job if the run
+        continues, otherwise records it as a gap"""
+        start = job.last_index
+        end = job.start_index + job.size
+        if job.processed_count is None:
+            haydi_logger.warning("{} was interrupted, its progress is "
+                                 "unknown".format(job))
+            return
+        if start >= end:
+            return
+        if (self.strategy.splittable and not self.canceled and
+                not self.limit_reached and self._has_time_for_job()):
+            self.requeued.append((start, end))
+        else:
+            self.gaps.append((start, end))
+            self.index_uncovered += end - start
+
+    def _has_time_for_job(self):
+        """Returns False if jobs would be interrupted before the timeout"""
+        return (self.timeout_mgr is None or
+                self.timeout_mgr.get_remaining_time() >
+                self.cached_args["safety_margin"])
+
+    def _update_prefix(self, job):
+        """Counts results in the longest finished prefix of indices"""
+        heapq.heappush(self.prefix_pending,
+                       (job.start_index, job.last_index - job.start_index,
+                        len(job.result)))
+        while (self.prefix_pending and
+               self.prefix_pending[0][0] <= self.prefix_index):
+            start, size, count = heapq.heappop(self.prefix_pending)
+            self.prefix_index = start + size
+            self.prefix_count += count
+        if self.prefix_count >= self.result_limit:
+            self.limit_reached = True
+
     def _get_remaining_work(self):
         if self.size:
             return self.size - self.index_scheduled
         else:
             return -1
 
+    def _has_running_jobs(self):
+        return (self.index_completed + self.index_uncovered <
+                self.index_scheduled)
+
     def _has_more_work(self):
-        return (not self.size or self.index_scheduled < self.size)\
-               and not self.strategy.exhausted
+        if self.limit_reached:
+            return False
+        return bool(self.requeued) or (
+            (not self.size or self.index_scheduled < self.size) and
+            not self.strategy.exhausted)
@@ -7,15 +7,7 @@ class SerialContext(object):
 
     def run(self, pipeline,
             timeout=None, otf_trace=None):
-        it = iterhelpers.make_iter_by_method(pipeline.domain, pipeline.method)
-        it = iterhelpers.apply_transformations(it, pipeline.transformations)
-
-        if pipeline.take_count is not None:
-            it = itertools.islice(it,
-                                  pipeline.take_count)
-
-        if timeout:
-            it = iterhelpers.iterate_with_timeout(it, timeout)
+        it = self._make_iter(pipeline, timeout)
 
         action = pipeline.action
 
@@ -52,3 +44,17 @@ class SerialContext(object):
                 return reduce(global_reduce_fn, result, global_reduce_init())
         else:
             return result
+
+    def stream(self, pipeline, timeout=None, ordered=True, max_pending=None):
+        return self._make_iter(pipeline, timeout)
+
+    def _make_iter(self, pipeline, timeout):
+        it = iterhelpers.make_pipeline_iter(pipeline)
+
+        if pipeline.take_count is not None:
+            it = itertools.islice(it,
+                                  pipeline.take_count)
+
+        if timeout:
+            it = iterhelpers.iterate_with_timeout(it, timeout)
+        return it
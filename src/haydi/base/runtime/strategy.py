@@ -1,15 +1,25 @@
 from haydi import Values
 from haydi.base.runtime.iterhelpers import make_iter_by_method
 from haydi.base.runtime.util import TimeoutManager
-from .worker import worker_step, worker_precomputed, worker_generator
+from .worker import (worker_step, worker_precomputed, worker_generator,
+                     worker_cnf_split)
 
 
 class WorkerStrategy(object):
+
+    # Jobs can be created over arbitrary index ranges without any work
+    # on the master
+    splittable = False
+
+    # Upper bound of the default safety margin (in seconds)
+    max_safety_margin = 60
+
     def __init__(self, pipeline, timeout=None):
         self.pipeline = pipeline
         self.timeout_mgr = TimeoutManager(timeout) if timeout else None
         self.size = self._compute_size(pipeline)
         self.exhausted = False
+        self.result_limit = self._compute_result_limit(pipeline)
 
     def _compute_size(self, pipeline):
         if pipeline.method == "generate" and pipeline.take_count:
@@ -17,21 +27,48 @@ class WorkerStrategy(object):
         else:
             return pipeline.domain.size
 
+    def _compute_result_limit(self, pipeline):
+        """Returns the number of results that is enough to compose the final
+        result (jobs of collect pipelines are returned as lists of elements
+        and only the first ``take_count`` elements are used)"""
+        if pipeline.action.worker_reduce_fn is None:
+            return pipeline.take_count
+        return None
+
     def create_cached_args(self):
         return {
             "domain": self.pipeline.domain,
             "transformations": self.pipeline.transformations,
             "reduce_fn": self.pipeline.action.worker_reduce_fn,
             "reduce_init": self.pipeline.action.worker_reduce_init,
-            "timelimit": self._get_timelimit()
+            "timelimit": self._get_timelimit(),
+            "result_limit": self.result_limit,
+            "safety_margin": self.get_safety_margin(None),
+            "cancel_flag": None
         }
 
     def get_args_for_batch(self, cached_args, start, job_size):
         return (cached_args, start, job_size)
 
+    def get_safety_margin(self, safety_margin):
+        """Returns the time (in seconds) between the end of jobs and the
+        timeout of the run; if ``safety_margin`` is ``None`` then it is
+        a tenth of the timeout (at most ``max_safety_margin``)"""
+        if safety_margin is not None:
+            return safety_margin
+        if self.timeout_mgr is None:
+            return 0
+        return min(self.max_safety_margin,
+                   self.timeout_mgr.get_total_time() / 10.0)
+
     def create_job(self, batches):
         return (self._get_worker_fn(), batches)
 
+    def skip(self, start, count):
+        """Called when the range of indices was already computed and no job
+        is created for it"""
+        pass
+
     def _get_worker_fn(self):
         raise NotImplementedError()
 
@@ -42,6 +79,9 @@ class WorkerStrategy(object):
 
 
 class StepStrategy(WorkerStrategy):
+
+    splittable = True
+
     def _get_worker_fn(self):
         return worker_step
 
@@ -53,12 +93,9 @@ class PrecomputeStrategy(WorkerStrategy):
                                             pipeline.method)
 
     def create_cached_args(self):
-        return {
-            "transformations": self.pipeline.transformations,
-            "reduce_fn": self.pipeline.action.worker_reduce_fn,
-            "reduce_init": self.pipeline.action.worker_reduce_init,
-            "timelimit": self._get_timelimit()
-        }
+        args = super(PrecomputeStrategy, self).create_cached_args()
+        del args["domain"]
+        return args
 
     def get_args_for_batch(self, cached_args, start, job_size):
         values = []
@@ -72,10 +109,72 @@ class PrecomputeStrategy(WorkerStrategy):
 
         return (cached_args, Values(values), start, job_size)
 
+    def skip(self, start, count):
+        if not self.exhausted:
+            for i in xrange(count):
+                try:
+                    self.iterator.next()
+                except StopIteration:
+                    self.exhausted = True
+                    break
+
     def _get_worker_fn(self):
         return worker_precomputed
 
 
+class CnfSplitStrategy(WorkerStrategy):
+    """Strategy that splits the search tree of canonical forms into units
+    (see :meth:`haydi.Domain.create_cn_split_iter`); jobs are ranges of
+    units and workers expand their subtrees locally.
+    """
+
+    splittable = True
+
+    # Minimal number of units when the split depth is chosen automatically
+    min_units = 512
+    max_depth = 16
+
+    def __init__(self, pipeline, timeout=None):
+        self.split_depth = pipeline.split_depth
+        super(CnfSplitStrategy, self).__init__(pipeline, timeout)
+
+    def _compute_size(self, pipeline):
+        domain = pipeline.domain
+        if self.split_depth is not None:
+            return domain.get_cn_split_size(self.split_depth)
+
+        depth = 1
+        size = domain.get_cn_split_size(depth)
+        while size < self.min_units and depth < self.max_depth:
+            next_size = domain.get_cn_split_size(depth + 1)
+            if next_size == size:
+                break
+            depth += 1
+            size = next_size
+        self.split_depth = depth
+        return size
+
+    def create_cached_args(self):
+        args = super(CnfSplitStrategy, self).create_cached_args()
+        args["split_depth"] = self.split_depth
+        return args
+
+    def _get_worker_fn(self):
+        return worker_cnf_split
+
+
 class GeneratorStrategy(WorkerStrategy):
     def _get_worker_fn(self):
         return worker_generator
+
+
+def create_strategy(pipeline, timeout=None):
+    if pipeline.method == "generate":
+        return GeneratorStrategy(pipeline, timeout)
+    elif pipeline.method == "iterate" and pipeline.domain.step_jumps:
+        return StepStrategy(pipeline, timeout)
+    elif (pipeline.method == "cnfs" and
+          pipeline.domain.supports_cn_split()):
+        return CnfSplitStrategy(pipeline, timeout)
+    else:
+        return PrecomputeStrategy(pipeline, timeout)
@@ -1,10 +1,12 @@
+import itertools
 import os
 import random
 import socket
 import time
 
-from .iterhelpers import generate, iterate_steps, apply_transformations
-from .scheduler import Job
+from .iterhelpers import (generate, iterate_steps, apply_transformations,
+                          JobGuard)
+from .job import Job
 
 
 random_initialized = False
@@ -18,47 +20,87 @@ def random_init(worker):
         random.seed(os.urandom(16) + worker + str(time.time()))
 
 
-def worker_compute(iterator, start, size, timelimit, reduce_fn, reduce_init):
+def worker_compute(iterator, start, size, timelimit, reduce_fn, reduce_init,
+                   result_limit=None, safety_margin=60, cancel_flag=None):
+    job, guard = _create_job(start, size, timelimit, safety_margin,
+                             cancel_flag)
+    if guard is not None:
+        iterator = guard.iterate(iterator)
+    return _evaluate(job, guard, iterator, reduce_fn, reduce_init,
+                     result_limit)
+
+
+def _create_job(start, size, timelimit, safety_margin, cancel_flag):
     worker_name = "{}#{}".format(socket.gethostname(), os.getpid())
     random_init(worker_name)
 
     job = Job(worker_name, start, size)
-    result = []
 
+    if timelimit is None and cancel_flag is None:
+        return job, None
+
+    # stop the job before the timeout of the run (or when the run is
+    # canceled), so its partial result still reaches the master
+    end_time = None
     if timelimit is not None:
-        for item in iterator:
-            result.append(item)
-            # return partial results
-            if timelimit - time.time() < 60:
-                break
-    else:
-        result = list(iterator)
+        end_time = timelimit - safety_margin
+    return job, JobGuard(job, end_time, cancel_flag)
+
+
+def _evaluate(job, guard, iterator, reduce_fn, reduce_init, result_limit):
+    if result_limit is not None:
+        # elements over the limit would be thrown away by the master
+        iterator = itertools.islice(iterator, result_limit)
 
     if reduce_fn is not None:
+        # fold items as they are produced, so the memory is bounded
+        # by the accumulator and not by the size of the job
         if reduce_init is None:
-            result = reduce(reduce_fn, result)
+            result = reduce(reduce_fn, iterator)
         else:
-            result = reduce(reduce_fn, result,
-                            reduce_init())
+            result = reduce(reduce_fn, iterator, reduce_init())
+    else:
+        result = list(iterator)
+
+    if guard is not None:
+        job.processed_count = guard.count
 
     job.finish(result)
     return job
 
 
+def _compute(worker_args, start, size, make_iter):
+    """Computes a job; ``make_iter(guard)`` creates the iterator of the job
+    that is stopped by the guard (the guard may be ``None``)"""
+    job, guard = _create_job(start, size,
+                             worker_args["timelimit"],
+                             worker_args["safety_margin"],
+                             worker_args["cancel_flag"])
+    return _evaluate(job, guard, make_iter(guard),
+                     worker_args["reduce_fn"],
+                     worker_args["reduce_init"],
+                     worker_args["result_limit"])
+
+
+def _guard_iter(guard, iterator):
+    if guard is None:
+        return iterator
+    return guard.iterate(iterator)
+
+
 def worker_step(arg):
     """
     :type arg: (dict, int, int)
     :rtype: Job
     """
     worker_args, start, size = arg
-    iterator = iterate_steps(worker_args["domain"],
+
+    def make_iter(guard):
+        return iterate_steps(worker_args["domain"],
                              worker_args["transformations"],
-                             start, start + size)
+                             start, start + size, guard)
 
-    return worker_compute(iterator, start, size,
-                          worker_args["timelimit"],
-                          worker_args["reduce_fn"],
-                          worker_args["reduce_init"])
+    return _compute(worker_args, start, size, make_iter)
 
 
 def worker_precomputed(arg):
@@ -67,13 +109,31 @@ def worker_precomputed(arg):
     :rtype: Job
     """
     worker_args, values, start, size = arg
-    iterator = apply_transformations(values.create_iter(),
+
+    def make_iter(guard):
+        return apply_transformations(
+            _guard_iter(guard, values.create_iter()),
+            worker_args["transformations"])
+
+    return _compute(worker_args, start, size, make_iter)
+
+
+def worker_cnf_split(arg):
+    """
+    :type arg: (dict, int, int)
+    :rtype: Job
+    """
+    worker_args, start, size = arg
+
+    def make_iter(guard):
+        # the guard is checked between units, so the finished units are
+        # complete
+        iterator = worker_args["domain"].create_cn_split_iter(
+            worker_args["split_depth"], start, start + size, guard)
+        return apply_transformations(iterator,
                                      worker_args["transformations"])
 
-    return worker_compute(iterator, start, size,
-                          worker_args["timelimit"],
-                          worker_args["reduce_fn"],
-                          worker_args["reduce_init"])
+    return _compute(worker_args, start, size, make_iter)
 
 
 def worker_generator(arg):
@@ -88,9 +148,8 @@ def worker_generator(arg):
         for i in xrange(size):
             yield domain_iter.next()
 
-    it = apply_transformations(iterator(), worker_args["transformations"])
+    def make_iter(guard):
+        return apply_transformations(_guard_iter(guard, iterator()),
+                                     worker_args["transformations"])
 
-    return worker_compute(it, start, size,
-                          worker_args["timelimit"],
-                          worker_args["reduce_fn"],
-                          worker_args["reduce_init"])
+    return _compute(worker_args, start, size, make_iter)
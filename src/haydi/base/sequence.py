@@ -2,7 +2,7 @@
 from .domain import Domain
 from .product import Product
 from .join import Join
-from .cnf import canonical_builder
+from .cnf import iterate_builder
 
 
 class Sequences(Domain):
@@ -53,6 +53,9 @@ class Sequences(Domain):
         return self.helper.size
 
     def create_cn_iter(self):
+        return iterate_builder(self._get_cn_builder())
+
+    def _get_cn_builder(self):
         def make_fn(item, candidate):
             item += (candidate,)
             if len(item) == max_length:
@@ -61,14 +64,28 @@ class Sequences(Domain):
         domain = self.domain
         max_length = self.max_length
         min_length = self.min_length
-        if min_length == 0:
-            yield ()
-        for item in canonical_builder(domain, (), make_fn, None):
-            yield item
+        initial = ((),) if min_length == 0 else ()
+        return initial, domain, (), make_fn, None
 
     def _make_iter(self, step):
         return self.helper.create_iter(step)
 
+    def _make_skip_iter(self, step):
+        return self.helper.create_skip_iter(step)
+
+    def _unrank(self, index):
+        return self.helper._unrank(index)
+
+    def _rank(self, element):
+        return self.helper._rank(element)
+
+    def supports_batch_iter(self):
+        return (self.min_length == self.max_length and
+                self.helper.supports_batch_iter())
+
+    def _make_batch_iter(self, step, batch_size, end):
+        return self.helper._make_batch_iter(step, batch_size, end)
+
     def generate_one(self):
         return self.helper.generate_one()
 
@@ -1,6 +1,6 @@
-from .domain import Domain
-from .basictypes import Set, compare
-from .cnf import canonical_builder
+from .domain import Domain, StepSkip, skip1
+from .basictypes import Set, compare, is_sorted
+from .cnf import iterate_builder
 from .utils import ncr
 import random
 
@@ -55,7 +55,6 @@ class Subsets(Domain):
 
         super(Subsets, self).__init__(name)
         self._set_flags_from_domain(domain)
-        self.step_jumps = False  # steps not yet implemented
         self.domain = domain
         self.min_size = min_size
         self.max_size = max_size
@@ -63,8 +62,8 @@ class Subsets(Domain):
         assert not isinstance(self.set_class, str)
         if set_class != Set and set_class is not tuple:
             self.strict = False
-        self.values = None
         self._cache = None
+        self._skip_cache = None
 
     def _compute_size(self):
         domain_size = self.domain.size
@@ -81,25 +80,49 @@ class Subsets(Domain):
             self._cache = tuple(self.domain)
             return self._cache
 
+    def _get_set_factory(self, cache):
+        # Values of subsets are always in the order of cache; when the cache
+        # is sorted, items do not have to be sorted again
+        if (self.set_class is Set and
+                is_sorted([v for v in cache if v is not skip1])):
+            return _make_prepared_set
+        return self.set_class
+
     def _make_iter(self, step):
-        assert step == 0  # sets not yet implemented
         cache = self._get_cache()
         min_size = self.min_size
         max_size = self.max_size
+        size = len(cache)
 
-        set_class = self.set_class
+        set_class = self._get_set_factory(cache)
 
-        if min_size == 0:
-            yield set_class(())
-
-        if max_size == 0:
+        if step >= self._count_extensions(size, 0):
             return
 
         indices = [0] * max_size
-        values = [cache[0]] * max_size
+        values = [None] * max_size
         i = 0
         last = max_size - 1
-        size = len(cache)
+
+        if step:
+            # Set the state as the first subset was just created
+            start = self._unrank_indices(step, size)
+            for j, index in enumerate(start):
+                values[j] = cache[index]
+                indices[j] = index + 1
+            i = len(start)
+            if i == max_size:
+                i = last
+                indices[i] -= 1
+            else:
+                indices[i] = start[-1] + 1
+                yield set_class(values[:i])
+        elif min_size == 0:
+            yield set_class(())
+
+        if max_size == 0:
+            return
+
         while i >= 0:
             if i == last:
                 for index in xrange(indices[i], size):
@@ -120,6 +143,128 @@ class Subsets(Domain):
             else:
                 i -= 1
 
+    def _count_extensions(self, remaining, length):
+        """Returns the number of subsets that extend a subset of a given
+        length by elements from ``remaining`` elements (the subset itself
+        is included if it is valid)"""
+        return sum(ncr(remaining, i)
+                   for i in xrange(max(0, self.min_size - length),
+                                   self.max_size - length + 1))
+
+    def _unrank_indices(self, index, size):
+        # Subsets are ordered lexicographically as sorted sequences
+        # of indices, where a prefix precedes its extensions
+        indices = []
+        i = 0
+        while True:
+            length = len(indices)
+            if length >= self.min_size:
+                if index == 0:
+                    return indices
+                index -= 1
+            while True:
+                count = self._count_extensions(size - i - 1, length + 1)
+                if index < count:
+                    break
+                index -= count
+                i += 1
+            indices.append(i)
+            i += 1
+
+    def _rank_indices(self, indices, size):
+        index = 0
+        i = 0
+        for length, value in enumerate(indices):
+            if length >= self.min_size:
+                index += 1
+            while i < value:
+                index += self._count_extensions(size - i - 1, length + 1)
+                i += 1
+            i += 1
+        return index
+
+    def _unrank(self, index):
+        cache = self._get_cache()
+        return self.set_class([cache[i]
+                               for i in self._unrank_indices(
+                                   index, len(cache))])
+
+    def _rank(self, element):
+        if isinstance(element, Set):
+            items = element.items
+        else:
+            items = tuple(element)
+        indices = sorted(self.domain._rank(item) for item in items)
+        if (not self.min_size <= len(indices) <= self.max_size or
+                len(set(indices)) != len(indices)):
+            raise ValueError("{} is not in domain".format(element))
+        return self._rank_indices(indices, self.domain.size)
+
+    def _get_skip_cache(self):
+        # Elements of the inner domain where filtered elements
+        # are replaced by 'skip1'
+        if self._skip_cache is None:
+            cache = []
+            for item in self.domain.create_skip_iter():
+                if isinstance(item, StepSkip):
+                    cache.extend([skip1] * item.value)
+                else:
+                    cache.append(item)
+            self._skip_cache = tuple(cache)
+        return self._skip_cache
+
+    def _make_skip_iter(self, step):
+        cache = self._get_skip_cache()
+        min_size = self.min_size
+        max_size = self.max_size
+        size = len(cache)
+        set_class = self._get_set_factory(cache)
+
+        if step >= self._count_extensions(size, 0):
+            return
+
+        indices = self._unrank_indices(step, size)
+        for j, index in enumerate(indices):
+            if cache[index] is skip1:
+                # Step points into a subtree of filtered subsets
+                del indices[j + 1:]
+                first = self._rank_indices(indices, size)
+                yield StepSkip(first - step + self._count_extensions(
+                    size - index - 1, j + 1))
+                break
+        else:
+            j = -1  # the first subset has to be processed
+
+        values = [cache[index] for index in indices]
+        while True:
+            length = len(indices)
+            if j < 0:
+                last = indices[-1] if indices else -1
+                if last >= 0 and cache[last] is skip1:
+                    count = self._count_extensions(size - last - 1, length)
+                    if count:
+                        yield StepSkip(count)
+                else:
+                    if length >= min_size:
+                        yield set_class(values)
+                    # Go to the first extension
+                    if (length < max_size and last + 1 < size and
+                            length + size - last - 1 >= min_size):
+                        indices.append(last + 1)
+                        values.append(cache[last + 1])
+                        continue
+            j = -1
+            # Go to the next sibling
+            while indices:
+                index = indices.pop() + 1
+                values.pop()
+                if index < size:
+                    indices.append(index)
+                    values.append(cache[index])
+                    break
+            else:
+                return
+
     def generate_one(self):
         cache = self._get_cache()
         if self.max_size == self.min_size:
@@ -136,6 +281,9 @@ class Subsets(Domain):
         return self.set_class(random.sample(cache, size))
 
     def create_cn_iter(self):
+        return iterate_builder(self._get_cn_builder())
+
+    def _get_cn_builder(self):
         domain = self.domain
         max_size = self.max_size
         min_size = self.min_size
@@ -150,11 +298,13 @@ class Subsets(Domain):
             if len(new_items) == max_size:
                 return s, None, True, None
             return s, domain, len(new_items) >= min_size, None
-        if min_size == 0:
-            yield Set((), True)
-        for item in canonical_builder(domain, Set((), True), make_fn, None):
-            yield item
+        initial = (Set((), True),) if min_size == 0 else ()
+        return initial, domain, Set((), True), make_fn, None
 
     def _remap_domains(self, transformation):
         return Subsets(transformation(self.domain), self.min_size,
                        self.max_size, self.set_class, self.name)
+
+
+def _make_prepared_set(items):
+    return Set(items, True)
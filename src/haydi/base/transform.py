@@ -1,5 +1,6 @@
 
 from .domain import StepSkip, skip1
+from .batch import BATCH_SIZE, make_batch, unbatch, split_to_chunks
 
 
 class Transformation(object):
@@ -57,3 +58,64 @@ class FilterTransformation(Transformation):
                 yield v
             else:
                 yield skip1
+
+
+class BatchTransformation(Transformation):
+    """Transformation applied on NumPy arrays of elements
+
+    If the source of elements provides batches (see
+    :meth:`haydi.Domain.create_batch_iter`) then the transformation is applied
+    directly on them; otherwise elements are grouped into batches.
+    """
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def transform_batch(self, batch):
+        raise NotImplementedError()
+
+    def _transform_items(self, items):
+        """Returns a list aligned with ``items``;
+        a removed item is replaced by ``skip1``"""
+        raise NotImplementedError()
+
+    def transform_iter(self, iterator):
+        for items in split_to_chunks(iterator, BATCH_SIZE):
+            for v in self._transform_items(items):
+                if v is not skip1:
+                    yield v
+
+    def transform_skip_iter(self, iterator):
+        for chunk in split_to_chunks(iterator, BATCH_SIZE):
+            items = [v for v in chunk if not isinstance(v, StepSkip)]
+            if items:
+                results = iter(self._transform_items(items))
+            for v in chunk:
+                if isinstance(v, StepSkip):
+                    yield v
+                else:
+                    yield next(results)
+
+
+class BatchMapTransformation(BatchTransformation):
+
+    def transform_batch(self, batch):
+        return self.fn(batch)
+
+    def _transform_items(self, items):
+        return unbatch(self.fn(make_batch(items)))
+
+
+class BatchFilterTransformation(BatchTransformation):
+
+    def init_transformed_domain(self, domain, parent):
+        super(BatchFilterTransformation, self).init_transformed_domain(
+            domain, parent)
+        domain.filtered = True
+
+    def transform_batch(self, batch):
+        return batch[self.fn(batch)]
+
+    def _transform_items(self, items):
+        mask = self.fn(make_batch(items))
+        return [item if m else skip1 for item, m in zip(items, mask)]
@@ -38,6 +38,14 @@ class USet(Domain):
         else:
             return iter(self.cache[step:])
 
+    def _unrank(self, index):
+        return self.cache[index]
+
+    def _rank(self, element):
+        if not isinstance(element, Atom) or element.parent is not self:
+            raise ValueError("{} is not in domain".format(element))
+        return element.index
+
     def create_cn_iter(self):
         yield self.cache[0]
 
@@ -1,5 +1,6 @@
 from .domain import Domain
-from .cnf import expand, is_canonical
+from .cnf import iter_expand, is_canonical
+from .batch import values_to_array
 
 import random
 
@@ -26,6 +27,21 @@ class Values(Domain):
         values = tuple(values)
         self._size = len(values)
         self.values = values
+        self._array = None
+        self._array_created = False
+
+    @property
+    def vectorizable(self):
+        return self._get_array() is not None
+
+    def _batch_values(self, indices):
+        return self._get_array()[indices]
+
+    def _get_array(self):
+        if not self._array_created:
+            self._array = values_to_array(self.values)
+            self._array_created = True
+        return self._array
 
     def generate_one(self):
         return random.choice(self.values)
@@ -36,6 +52,12 @@ class Values(Domain):
             step += 1
         raise StopIteration()
 
+    def _unrank(self, index):
+        return self.values[index]
+
+    def _rank(self, element):
+        return self.values.index(element)
+
     def to_values(self, max_size=None):
         return self
 
@@ -81,7 +103,7 @@ class CnfValues(Domain):
     def create_iter(self, step=0):
         assert step == 0
         for item in self.values:
-            for item2 in expand(item):
+            for item2 in iter_expand(item):
                 yield item2
 
     def to_cnf_values(self, max_size=None):
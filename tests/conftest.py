@@ -10,6 +10,9 @@ SRC_DIR = os.path.join(ROOT_DIR, "src")
 if SRC_DIR not in sys.path:
     sys.path.insert(0, SRC_DIR)
 
+import haydi as hd  # noqa
+from haydi.base.runtime.job import Job  # noqa
+
 
 def pytest_addoption(parser):
     parser.addoption("--runslow", action="store_true",
@@ -20,3 +23,25 @@ def pytest_runtest_setup(item):
     """Skip tests if they are marked as slow and --runslow is not given"""
     if getattr(item.obj, 'slow', None) and not item.config.getvalue('runslow'):
         pytest.skip('slow tests not requested')
+
+
+def skip_iter_elements(domain, start):
+    """Returns elements of the skip iterator of the domain from ``start``
+    and checks that elements and skips cover the rest of the domain"""
+    result = []
+    steps = 0
+    for v in domain.create_skip_iter(start):
+        if isinstance(v, hd.StepSkip):
+            assert v.value > 0
+            steps += v.value
+        else:
+            result.append(v)
+            steps += 1
+    assert steps == max(domain.size - start, 0)
+    return result
+
+
+def make_job(start, size, result):
+    job = Job("w", start, size)
+    job.finish(result)
+    return job
@@ -194,6 +194,59 @@ def test_compare_types():
     assert hdt.compare(X(100), X(10)) == 1
 
 
+def test_compare2_types():
+    ax = USet(3, "a")
+    a1, a2, a3 = ax.all()
+
+    assert hdt.compare2(a1, {}, 10, {}) == -1
+    assert hdt.compare2((a1,), {a1: a2}, "C", {}) == 1
+    assert hdt.compare2(hdt.Set((a1, 10)), {}, hdt.Set((a2, 10)), {}) == -1
+    assert hdt.compare2(
+        hdt.Set((a1, 10)), {a1: a3}, hdt.Set((a2, 10)), {}) == 1
+
+
+def test_atom_pickle():
+    import pickle
+
+    ax = USet(3, "a")
+    for protocol in (0, 2):
+        atoms = pickle.loads(pickle.dumps(ax.all(), protocol))
+        assert [a.index for a in atoms] == [0, 1, 2]
+        assert atoms[0].parent.all()[0] is atoms[0]
+        assert hdt.compare(atoms[0], atoms[2]) == -1
+
+
+def test_sort_key():
+    ax = USet(3, "a")
+    bx = USet(2, "b")
+    a0, a1, a2 = ax.all()
+    b0, b1 = bx.all()
+
+    items = [a0, a2, b1, 0, 7, True, None, "x", "abc", (), (a1,), (a0, 3),
+             (1, a0), hdt.Set((a1, b0)), hdt.Set((a0,)), hdt.Set(()),
+             hdt.Map(((a0, 1), (a1, 2))), hdt.Map(((a0, 2),)),
+             hdt.Set((hdt.Set((a1,)), hdt.Set((a0, a1))))]
+    for i in items:
+        for j in items:
+            assert cmp(hdt.sort_key(i), hdt.sort_key(j)) == hdt.compare(i, j)
+
+    perm = {a0: a1, a1: a0}
+    for i in items:
+        for j in items:
+            if type(i) == type(j):
+                assert (cmp(hdt.permuted_sort_key(i, perm),
+                            hdt.permuted_sort_key(j, {})) ==
+                        hdt.compare(hdt.replace_atoms(
+                            i, lambda x: perm.get(x, x)), j))
+
+
+def test_is_sorted():
+    assert hdt.is_sorted([])
+    assert hdt.is_sorted([1, 2, "a"])
+    assert not hdt.is_sorted([1, 1, 2])
+    assert not hdt.is_sorted([2, 1])
+
+
 def test_collect_atoms():
     ax = USet(3, "a")
 
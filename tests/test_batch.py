@@ -0,0 +1,143 @@
+import pytest
+
+import haydi as hd
+from haydi.base.runtime.iterhelpers import iterate_steps
+
+np = pytest.importorskip("numpy")
+
+
+def batches_to_lists(batches):
+    return [b.tolist() for b in batches]
+
+
+def test_batch_iter_elementary():
+    r = hd.Range(2, 12, 2)
+    assert r.supports_batch_iter()
+    assert batches_to_lists(r.create_batch_iter(batch_size=2)) == \
+        [[2, 4], [6, 8], [10]]
+    assert batches_to_lists(r.create_batch_iter(1, 2, 4)) == [[4, 6], [8]]
+
+    assert batches_to_lists(hd.Boolean().create_batch_iter()) == \
+        [[False, True]]
+    assert batches_to_lists(hd.Values((3, 1, 2)).create_batch_iter()) == \
+        [[3, 1, 2]]
+
+
+def test_batch_iter_product():
+    p = hd.Range(3) * hd.Values((10, 20)) * hd.Range(4)
+    assert p.supports_batch_iter()
+    rows = []
+    for b in p.create_batch_iter(batch_size=5):
+        assert b.shape[1] == 3
+        rows.extend(tuple(row) for row in b.tolist())
+    assert rows == list(p)
+
+    rows = []
+    for b in p.create_batch_iter(7, 5, 20):
+        rows.extend(tuple(row) for row in b.tolist())
+    assert rows == list(p)[7:20]
+
+
+def test_batch_iter_sequences():
+    s = hd.Sequences(hd.Range(3), 4)
+    assert s.supports_batch_iter()
+    rows = [tuple(row) for b in s.create_batch_iter(batch_size=10)
+            for row in b.tolist()]
+    assert rows == list(s)
+
+    assert not hd.Sequences(hd.Range(3), 1, 2).supports_batch_iter()
+
+
+def test_batch_iter_mixed_types():
+    p = hd.Boolean() * hd.Range(2)
+    assert p.supports_batch_iter()
+    result = p.iterate().filter_batch(lambda b: b[:, 1] == 1).run()
+    assert result == list(p.filter(lambda x: x[1] == 1))
+    assert [type(v) for v in result[0]] == [bool, int]
+
+    assert not hd.Values((0, True)).supports_batch_iter()
+
+
+def test_batch_iter_big_range():
+    r = hd.Range(2 ** 62)
+    assert batches_to_lists(r.create_batch_iter(2 ** 62 - 2)) == \
+        [[2 ** 62 - 2, 2 ** 62 - 1]]
+
+    p = hd.Range(2 ** 62) * hd.Range(4)
+    assert not p.supports_batch_iter()
+    result = p.iterate().filter_batch(lambda b: b[:, 1] == 3).take(2).run()
+    assert result == [(0, 3), (1, 3)]
+
+    assert not hd.Range(2 ** 63, 2 ** 63 + 2).supports_batch_iter()
+
+
+def test_batch_iter_unsupported():
+    assert not hd.Values(("a", 1)).supports_batch_iter()
+    assert not hd.NoneDomain().supports_batch_iter()
+    assert not hd.Range(4).filter(lambda x: x > 1).supports_batch_iter()
+    assert not (hd.Range(4) * hd.USet(3, "a")).supports_batch_iter()
+    assert not hd.Product((hd.Range(2) * hd.Range(2),)).supports_batch_iter()
+    with pytest.raises(Exception):
+        hd.Subsets(hd.Range(3)).create_batch_iter()
+
+
+def test_pipeline_filter_batch():
+    p = hd.Range(10) * hd.Range(10)
+    result = p.iterate().filter_batch(lambda b: b[:, 0] + b[:, 1] == 17)
+    assert result.run() == [(8, 9), (9, 8)]
+
+    result = p.iterate() \
+              .filter_batch(lambda b: b[:, 0] > b[:, 1]) \
+              .map_batch(lambda b: b[:, 0] * b[:, 1]) \
+              .filter(lambda x: x % 2 == 1) \
+              .max().run()
+    assert result == [63]
+
+
+def test_pipeline_batch_fallback():
+    # a domain that does not support batches
+    p = hd.Values(("a", "bb", "ccc")) * hd.Range(3)
+    result = p.iterate().filter_batch(lambda b: b[:, 0] == "bb").run()
+    assert result == [("bb", 0), ("bb", 1), ("bb", 2)]
+
+    r = hd.Range(10).filter(lambda x: x % 2 == 0)
+    assert r.iterate().map_batch(lambda b: b * 3).run() == \
+        [0, 6, 12, 18, 24]
+
+
+def test_iterate_steps_batch():
+    p = (hd.Range(5) * hd.Range(5)).iterate() \
+        .filter_batch(lambda b: b[:, 0] == b[:, 1])
+    result = []
+    for i in xrange(0, 25, 7):
+        result.extend(iterate_steps(p.domain, p.transformations, i, i + 7))
+    assert result == [(i, i) for i in xrange(5)]
+
+    p = hd.Range(10).filter(lambda x: x > 2).iterate() \
+        .filter_batch(lambda b: b % 2 == 0)
+    result = []
+    for i in xrange(0, 10, 3):
+        result.extend(iterate_steps(p.domain, p.transformations, i, i + 3))
+    assert result == [4, 6, 8]
+
+
+def test_iterate_steps_batch_range():
+    calls = [0]
+
+    def fn(x):
+        calls[0] += 1
+        return x
+
+    p = hd.Range(10000).iterate().map(fn).filter_batch(lambda b: b % 2 == 0)
+    assert list(iterate_steps(p.domain, p.transformations, 10, 20)) == \
+        [10, 12, 14, 16, 18]
+    assert calls[0] == 10
+
+
+def test_parallel_filter_batch():
+    ctx = hd.ParallelContext(2, job_size=7)
+    p = (hd.Range(20) * hd.Range(20)).iterate() \
+        .filter_batch(lambda b: (b[:, 0] * b[:, 1]) % 7 == 3)
+    assert p.run(ctx) == p.run()
+    assert isinstance(p.run()[0][0], int)
+    assert not isinstance(p.run()[0][0], np.integer)
@@ -0,0 +1,119 @@
+import pytest
+
+from haydi.base.exception import HaydiException
+import haydi as hd
+from haydi.base.runtime.checkpoint import (Checkpoint, create_header,
+                                           get_completed_ranges,
+                                           get_pipeline_fingerprint)
+from conftest import make_job
+
+
+def test_checkpoint_resume(tmpdir):
+    path = str(tmpdir.join("ckpt"))
+    header = {"method": "iterate", "size": 100}
+
+    checkpoint = Checkpoint(path)
+    assert not checkpoint.exists()
+    checkpoint.create(header)
+    checkpoint.write_job(make_job(0, 10, [1, 2]))
+    checkpoint.write_job(make_job(20, 5, [3]))
+    checkpoint.close()
+
+    with pytest.raises(HaydiException):
+        Checkpoint(path).create(header)
+    with pytest.raises(HaydiException):
+        Checkpoint(path).resume({"method": "iterate", "size": 50})
+
+    checkpoint = Checkpoint(path)
+    jobs = checkpoint.resume(header)
+    assert [(j.start_index, j.size, j.result) for j in jobs] == [
+        (0, 10, [1, 2]), (20, 5, [3])]
+    checkpoint.write_job(make_job(10, 10, [4]))
+    checkpoint.close()
+
+    jobs = Checkpoint(path).resume(header)
+    assert [j.start_index for j in jobs] == [0, 20, 10]
+
+
+def test_checkpoint_incomplete_record(tmpdir):
+    path = str(tmpdir.join("ckpt"))
+    header = {"method": "iterate", "size": 100}
+
+    checkpoint = Checkpoint(path)
+    checkpoint.create(header)
+    checkpoint.write_job(make_job(0, 10, [1, 2]))
+    checkpoint.write_job(make_job(10, 10, [3]))
+    checkpoint.close()
+
+    with open(checkpoint.log_path, "r+b") as f:
+        f.seek(-3, 2)
+        f.truncate()
+
+    checkpoint = Checkpoint(path)
+    jobs = checkpoint.resume(header)
+    assert [j.start_index for j in jobs] == [0]
+    checkpoint.write_job(make_job(10, 10, [3]))
+    checkpoint.close()
+
+    jobs = Checkpoint(path).resume(header)
+    assert [j.result for j in jobs] == [[1, 2], [3]]
+
+
+def test_checkpoint_missing(tmpdir):
+    with pytest.raises(HaydiException):
+        Checkpoint(str(tmpdir.join("ckpt"))).resume({})
+
+
+def test_pipeline_fingerprint(tmpdir):
+    def make_pipeline(limit=10, key=3, size=2):
+        return hd.Range(100).filter(lambda x: x > limit) \
+                 .max(lambda x: x % key, size)
+
+    fingerprint = get_pipeline_fingerprint(make_pipeline())
+    assert fingerprint == get_pipeline_fingerprint(make_pipeline())
+    assert fingerprint != get_pipeline_fingerprint(make_pipeline(limit=11))
+    assert fingerprint != get_pipeline_fingerprint(make_pipeline(key=4))
+    assert fingerprint != get_pipeline_fingerprint(make_pipeline(size=3))
+
+    r = hd.Range(100)
+    fingerprints = set(get_pipeline_fingerprint(p) for p in (
+        r.collect(), r.take(5), r.take(6), r.map(str).collect(),
+        r.map(repr).collect(), r.groups(str, 1), r.reduce(max)))
+    assert len(fingerprints) == 7
+
+    ax = hd.USet(3, "a")
+    fingerprints = set(get_pipeline_fingerprint(d.collect()) for d in (
+        hd.Range(100), hd.Range(1, 101), hd.Values(range(500, 600)),
+        hd.Range(10) * hd.Range(10), hd.Range(10) + hd.Range(90),
+        hd.Mappings(ax, hd.Subsets(ax)), hd.Mappings(ax, hd.Subsets(ax, 1))))
+    assert len(fingerprints) == 7
+    domain = hd.Range(10) * hd.Range(10)
+    fingerprint = get_pipeline_fingerprint(domain.collect())
+    list(domain.generate(3))
+    assert fingerprint == get_pipeline_fingerprint(domain.collect())
+
+    pipeline = hd.Mappings(ax, ax).cnfs()
+    assert create_header(pipeline, 10, 1) != create_header(pipeline, 10, 2)
+
+    path = str(tmpdir.join("ckpt"))
+    checkpoint = Checkpoint(path)
+    checkpoint.create(create_header(make_pipeline(), 100))
+    checkpoint.close()
+    with pytest.raises(HaydiException):
+        Checkpoint(path).resume(create_header(make_pipeline(key=5), 100))
+    checkpoint = Checkpoint(path)
+    assert checkpoint.resume(create_header(make_pipeline(), 100)) == []
+    checkpoint.close()
+
+
+def test_completed_ranges():
+    jobs = [make_job(20, 5, None), make_job(0, 10, None),
+            make_job(10, 5, None), make_job(30, 1, None)]
+    assert get_completed_ranges(jobs) == [(0, 15), (20, 25), (30, 31)]
+    assert get_completed_ranges([]) == []
+
+    job = make_job(10, 5, None)
+    job.interrupted = True
+    job.processed_count = 2
+    jobs = [make_job(0, 10, None), job, make_job(15, 5, None)]
+    assert get_completed_ranges(jobs) == [(0, 12), (15, 20)]
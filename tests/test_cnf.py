@@ -313,3 +313,198 @@ def test_is_isomoprhic():
     assert hd.is_isomorphic(x, y)
     assert not hd.is_isomorphic(x, z)
     assert not hd.is_isomorphic(x, w)
+
+
+def test_cn_split_iter():
+    ax = USet(3, "a")
+    bx = USet(2, "b")
+    domains = (hd.Mappings(ax * bx, ax),
+               hd.Sequences(ax, 0, 3),
+               hd.Subsets(hd.Subsets(ax, 2)),
+               ax * ax * bx,
+               hd.Subsets(ax, 1, 2))
+    for domain in domains:
+        assert domain.supports_cn_split()
+        expected = list(domain.create_cn_iter())
+        for depth in (1, 2, 3, 10):
+            size = domain.get_cn_split_size(depth)
+            assert list(domain.create_cn_split_iter(depth)) == expected
+            for step in (1, 3):
+                result = []
+                for i in xrange(0, size, step):
+                    result.extend(
+                        domain.create_cn_split_iter(depth, i, i + step))
+                assert result == expected
+
+
+def test_cn_split_iter_no_builder():
+    ax = USet(3, "a")
+    assert not ax.supports_cn_split()
+    assert ax.get_cn_split_size(2) == 1
+    assert list(ax.create_cn_split_iter(2, 0, 1)) == [ax.get(0)]
+
+
+def test_is_canonical_search(monkeypatch):
+    monkeypatch.setattr(hdc, "SEARCH_THRESHOLD", 0)
+
+    ax = USet(3, "a")
+    bx = USet(2, "b")
+    domains = (hd.Mappings(ax * bx, ax),
+               hd.Mappings(ax, bx * hd.Range(2)),
+               hd.Subsets(hd.Subsets(ax, 2)),
+               hd.Subsets(ax + bx + hd.Range(2), 2, 3),
+               hd.Sequences(ax * bx, 2),
+               hd.Mappings(hd.Mappings(bx, bx), ax),
+               hd.Mappings(ax, hd.Subsets(bx)))
+    for domain in domains:
+        for item in domain:
+            item = hdc.remove_gaps(item)
+            assert hdc.is_canonical(item) == hdc.is_canonical_naive(item)
+        bf_check(domain)
+
+
+def test_permutation_table(monkeypatch):
+    monkeypatch.setattr(hdc, "_table_cache", hdc.collections.OrderedDict())
+    monkeypatch.setattr(hdc, "TABLE_CACHE_SIZE", 2)
+
+    table = hdc.get_permutation_table(((2, 2), (1, 2)))
+    assert table == ((0, 1, 3), (1, 0, 2), (1, 0, 3))
+    assert hdc.get_permutation_table(((2, 2), (1, 2))) is table
+
+    hdc.get_permutation_table(((3, 3),))
+    hdc.get_permutation_table(((2, 2), (1, 2)))
+    hdc.get_permutation_table(((1, 3),))
+    assert list(hdc._table_cache) == [((2, 2), (1, 2)), ((1, 3),)]
+
+    ax = USet(2, "a")
+    bx = USet(2, "b")
+    a0, a1 = ax.all()
+    b0, b1 = bx.all()
+    perms = hdc.make_permutations_all([(ax, 2), (bx, 1)])
+    assert perms == [{a0: a0, a1: a1, b0: b1},
+                     {a0: a1, a1: a0, b0: b0},
+                     {a0: a1, a1: a0, b0: b1}]
+    assert hdc.make_permutations_bounded([(ax, 2), (bx, 1)]) == \
+        [{a0: a1, a1: a0, b0: b0}]
+
+
+def test_canonize_cache():
+    ax = USet(3, "a")
+    a0, a1, a2 = ax.all()
+
+    cache = hd.CanonizeCache(max_size=3)
+    assert cache.canonize((a2, a1)) == (a0, a1)
+    assert cache.canonize((a0, a1)) == (a0, a1)  # canonical form is cached
+    assert cache.canonize((a2, a1)) == (a0, a1)
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert cache.canonize(None) is None
+    assert cache.canonize(None) is None
+    assert (cache.hits, cache.misses) == (3, 2)
+
+    assert cache.is_isomorphic((a1, a1), (a2, a2))
+    assert not cache.is_isomorphic((a1, a1), (a2, a0))
+    assert len(cache) == 3
+    # least recently used items were dropped
+    assert (a2, a1) not in cache.forms
+    assert (a2, a0) in cache.forms
+
+    cache.clear()
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_set_canonize_cache():
+    ax = USet(3, "a")
+    a0, a1, a2 = ax.all()
+
+    cache = hd.CanonizeCache()
+    hd.set_canonize_cache(cache)
+    try:
+        assert hd.canonize(hd.Set((a2, a1))) == hd.Set((a0, a1))
+        # the first set is cached, the second one is its canonical form
+        assert hd.is_isomorphic(hd.Set((a2, a1)), hd.Set((a1, a0)))
+        assert cache.hits == 2
+    finally:
+        hd.set_canonize_cache(None)
+    assert hd.canonize((a1,)) == (a0,)
+    assert cache.hits == 2
+
+
+def test_isomorphism_classes():
+    ax = USet(3, "a")
+    a0, a1, a2 = ax.all()
+    items = [(a1, a2), (a0, 1), (a0, a0), (a2, a0), (a1, 1), (a2, a2)]
+
+    for cache in (None, hd.CanonizeCache()):
+        classes = hd.isomorphism_classes(iter(items), cache)
+        assert classes.items() == [((a0, a1), [(a1, a2), (a2, a0)]),
+                                   ((a0, 1), [(a0, 1), (a1, 1)]),
+                                   ((a0, a0), [(a0, a0), (a2, a2)])]
+
+
+def test_iter_expand():
+    ax = USet(4, "a")
+    bx = USet(2, "b")
+    a0, a1, a2, a3 = ax.all()
+    b0, b1 = bx.all()
+
+    def naive_expand(item):
+        items = [hdc.apply_permutation(item, p) for p in
+                 hdc.make_permutations_all(hdc.get_bounds(item).items())]
+        items.append(item)
+        hdc.sort(items)
+        hdc.unique(items)
+        return items
+
+    items = [a0, "x", (a0, a0), (a0, a1, b0), hd.Set((a0, a1)),
+             hd.Set((hd.Set((a0, a1)), hd.Set((a1, a2)))),
+             hd.Map(((a0, b0), (a1, b0), (a2, b1)))]
+    items += list(hd.Mappings(ax * bx, bx).create_cn_iter())[:20]
+    for item in items:
+        result = list(hdc.iter_expand(item))
+        assert result[0] == item
+        hdc.sort(result)
+        assert result == naive_expand(item)
+        assert hdc.expand(item) == result
+
+    # items with gaps
+    for item in [(a1, a3), hd.Set((a1, a3)), (a3, b1, a1)]:
+        result = list(hdc.iter_expand(item, False))
+        hdc.sort(result)
+        assert result == naive_expand(hdc.remove_gaps(item))
+
+
+def test_cnf_values_iter():
+    ax = USet(3, "a")
+    a0, a1, a2 = ax.all()
+
+    values = hd.CnfValues([(a0, a1), (a0, a0)])
+    result = list(values)
+    assert len(result) == 9
+    assert set(result) == set(hd.Product((ax, ax)))
+
+
+def test_orbit_size():
+    ax = USet(4, "a")
+    bx = USet(2, "b")
+    a0, a1, a2, a3 = ax.all()
+    b0, b1 = bx.all()
+
+    items = [a0, "x", (a0, a0), (a0, a1, b0), (a1, a3), hd.Set((a0, a1)),
+             hd.Set((hd.Set((a0, a1)), hd.Set((a1, a2)))),
+             hd.Map(((a0, b0), (a1, b0), (a2, b1)))]
+    items += list(hd.Mappings(ax * bx, bx).create_cn_iter())[:20]
+    for item in items:
+        assert hd.orbit_size(item) == len(hdc.expand(item))
+
+
+def test_cnfs_weighted():
+    ax = USet(3, "a")
+    bx = USet(2, "b")
+    domain = hd.Mappings(ax * bx, ax)
+
+    result = list(domain.cnfs_weighted())
+    assert [item for item, weight in result] == list(domain.cnfs())
+    assert sum(weight for item, weight in result) == domain.size
+    for item, weight in result:
+        assert weight == len(hdc.expand(item))
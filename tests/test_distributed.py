@@ -165,3 +165,195 @@ def test_dist_precompute(cluster4):
     r2 = delta.cnfs().run(cluster4.ctx)
 
     assert len(r1) == len(r2)
+
+
+@pytest.mark.slow
+def test_dist_subsets(cluster4):
+    nodes = hd.USet(4, "n")
+    graphs = hd.Subsets(hd.Subsets(nodes, 2))
+    assert graphs.step_jumps
+
+    result = graphs.map(len).collect().run(cluster4.ctx)
+    assert result == graphs.map(len).collect().run()
+
+    f = hd.Subsets(hd.Range(8).filter(lambda x: x % 3 != 0), 2, 3)
+    result = f.map(lambda s: sum(s.items)).collect().run(cluster4.ctx)
+    assert result == f.map(lambda s: sum(s.items)).collect().run()
+
+
+@pytest.mark.slow
+def test_dist_cnfs_split(cluster4):
+    states = hd.USet(3, "q")
+    alphabet = hd.USet(2, "a")
+
+    delta = hd.Mappings(states * alphabet, states)
+    r1 = delta.cnfs().run()
+    r2 = delta.cnfs(split_depth=2).run(cluster4.ctx)
+
+    assert map(repr, r1) == map(repr, r2)
+
+
+def check_resume(ctx, pipeline, tmpdir):
+    from haydi.base.runtime.checkpoint import Checkpoint, create_header
+
+    expected = repr(pipeline.run())
+
+    path = str(tmpdir.join("full"))
+    ctx.checkpoint_dir = path
+    try:
+        assert repr(pipeline.run(ctx)) == expected
+    finally:
+        ctx.checkpoint_dir = None
+
+    # Keep only a part of finished jobs as an interrupted run would do
+    checkpoint = Checkpoint(path)
+    header = create_header(pipeline, pipeline.domain.size)
+    jobs = checkpoint.resume(header)
+    checkpoint.close()
+    assert jobs
+
+    path = str(tmpdir.join("partial"))
+    checkpoint = Checkpoint(path)
+    checkpoint.create(header)
+    for job in jobs[::2]:
+        checkpoint.write_job(job)
+    checkpoint.close()
+
+    assert repr(pipeline.run(ctx, resume=path)) == expected
+    assert repr(pipeline.run(ctx, resume=path)) == expected
+
+
+@pytest.mark.slow
+def test_dist_resume(cluster4, tmpdir):
+    r = hd.Range(2000).map(lambda x: x * 2)
+    check_resume(cluster4.ctx, r.collect(), tmpdir.mkdir("step"))
+    check_resume(cluster4.ctx, r.reduce(lambda x, y: x + y),
+                 tmpdir.mkdir("reduce"))
+
+    ax = hd.USet(3, "a")
+    bx = hd.USet(2, "b")
+    p = (ax + bx + hd.Range(300)).cnfs()
+    check_resume(cluster4.ctx, p, tmpdir.mkdir("precompute"))
+
+
+@pytest.mark.slow
+def test_dist_resume_timeout(cluster4, tmpdir):
+    import time
+    from haydi.base.runtime.checkpoint import (Checkpoint, create_header,
+                                               get_completed_ranges)
+
+    def slow(x):
+        time.sleep(0.02)
+        return x
+
+    # jobs take 2 seconds, they are interrupted in the middle
+    pipeline = hd.Range(800).map(slow).collect()
+    policy = hd.FixedSizePolicy(100, safety_margin=1)
+    path = str(tmpdir.join("checkpoint"))
+    cluster4.ctx.checkpoint_dir = path
+    try:
+        result = pipeline.run(cluster4.ctx, timeout=2, policy=policy)
+    finally:
+        cluster4.ctx.checkpoint_dir = None
+
+    checkpoint = Checkpoint(path)
+    jobs = checkpoint.resume(create_header(pipeline, 800))
+    checkpoint.close()
+    ranges = get_completed_ranges(jobs)
+    assert sum(end - start for start, end in ranges) == len(result)
+    assert 0 < len(result) < 800
+
+    assert pipeline.run(cluster4.ctx, resume=path) == range(800)
+
+
+@pytest.mark.slow
+def test_dist_stream(cluster4):
+    r = hd.Range(5000).map(lambda x: x * 2)
+    assert list(r.stream(cluster4.ctx)) == range(0, 10000, 2)
+    assert sorted(r.stream(cluster4.ctx, ordered=False, max_pending=2)) == \
+        range(0, 10000, 2)
+    assert list(r.take(300).stream(cluster4.ctx)) == range(0, 600, 2)
+
+    it = r.stream(cluster4.ctx, max_pending=4)
+    assert next(it) == 0
+    it.close()
+    assert r.filter(lambda x: x > 9990).collect().run(cluster4.ctx) == \
+        [9992, 9994, 9996, 9998]
+
+
+@pytest.mark.slow
+def test_dist_take_early_stop(cluster4):
+    r = hd.Range(10 ** 12)
+    assert r.filter(lambda x: x % 1000 == 999).take(3).run(cluster4.ctx) == \
+        [999, 1999, 2999]
+    assert r.filter(lambda x: x > 12345).first().run(cluster4.ctx) == 12346
+
+
+@pytest.mark.slow
+def test_dist_policies(cluster4):
+    r = hd.Range(3000).map(lambda x: x + 1)
+    expected = range(1, 3001)
+
+    assert r.collect().run(cluster4.ctx,
+                           policy=hd.LatencyPolicy()) == expected
+    assert r.filter(lambda x: x > 100).first().run(
+        cluster4.ctx, policy=hd.LatencyPolicy()) == 101
+
+    policy = hd.FixedSizePolicy(400)
+    assert r.collect().run(cluster4.ctx, policy=policy) == expected
+
+
+@pytest.mark.slow
+def test_dist_latency(cluster4):
+    import time
+
+    r = hd.Range(10)
+    r.run(cluster4.ctx)  # warm up workers
+
+    start = time.time()
+    assert r.map(lambda x: x + 1).run(cluster4.ctx) == range(1, 11)
+    assert time.time() - start < 2
+
+
+@pytest.mark.slow
+def test_dist_cancel_jobs(cluster4, tmpdir):
+    import time
+
+    log = str(tmpdir.join("log"))
+
+    def slow(x):
+        if x > 0:
+            time.sleep(0.01)
+            with open(log, "a") as f:
+                f.write(".")
+        return x
+
+    # jobs of 1000 elements take 10 seconds; they are canceled as soon as
+    # the first element is found
+    r = hd.Range(10 ** 6).map(slow).filter(lambda x: x == 0)
+    policy = hd.FixedSizePolicy(1000)
+    assert r.take(1).run(cluster4.ctx, policy=policy) == [0]
+
+    time.sleep(2)
+    size = tmpdir.join("log").size()
+    time.sleep(1)
+    assert tmpdir.join("log").size() == size
+
+    # flags of finished and canceled runs are removed from the scheduler
+    assert hd.Range(10).collect().run(cluster4.ctx) == range(10)
+
+    def get_flags(dask_scheduler=None):
+        return [key for key in dask_scheduler.task_metadata
+                if key.startswith("haydi-cancel")]
+
+    assert cluster4.ctx.executor.run_on_scheduler(get_flags) == []
+
+
+@pytest.mark.slow
+def test_dist_bounded_results(cluster4):
+    r = hd.Range(3000)
+    policy = hd.FixedSizePolicy(100)
+    p = r.max(lambda x: x % 7, 5)
+    assert p.run(cluster4.ctx, policy=policy) == p.run()
+    p = r.groups(lambda x: x % 3, 2)
+    assert p.run(cluster4.ctx, policy=policy) == p.run()
@@ -1,4 +1,5 @@
 import haydi as hd
+from haydi.base.runtime.iterhelpers import iterate_steps
 
 
 def test_iterator_first():
@@ -14,3 +15,10 @@ def test_iterator_reduce():
     expected = max(range(10))
     result = hd.Range(10).reduce(max).run()
     assert expected == result
+
+
+def test_iterate_steps_pipeline_filter():
+    p = hd.Range(10).filter(lambda x: x > 5).map(lambda x: x * 10).iterate()
+    result = [list(iterate_steps(p.domain, p.transformations, i, i + 1))
+              for i in xrange(10)]
+    assert result == [[]] * 6 + [[60], [70], [80], [90]]
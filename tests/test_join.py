@@ -1,4 +1,6 @@
+import pytest
 import haydi as hd
+from conftest import skip_iter_elements
 
 
 def test_join_range_iterate():
@@ -108,3 +110,22 @@ def test_join_to_values_maxsize():
     assert isinstance(v, hd.Join)
     assert all(isinstance(d, hd.Values) for d in v.domains)
     assert list(c) == list(v)
+
+
+def test_join_rank():
+    j = hd.Values(["a"]) + hd.Range(0) + hd.Range(10) + hd.Values(["b", 3])
+    assert [j.unrank(i) for i in xrange(j.size)] == list(j)
+    assert [j.rank(x) for x in j] == [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 4]
+    with pytest.raises(ValueError):
+        j.rank("c")
+
+
+def test_join_skip_iter():
+    r = hd.Range(4)
+    j = r.filter(lambda x: x % 2) + hd.Values(["a"]) + r.filter(lambda x: x)
+    assert j.filtered
+    assert list(j) == [1, 3, "a", 1, 2, 3]
+    for i in xrange(j.size + 2):
+        skip_iter_elements(j, i)
+    assert list(j.iterate_steps(2, 7)) == [3, "a", 1]
+    assert list(j.iterate_steps(5, 9)) == [1, 2, 3]
@@ -1,4 +1,6 @@
+import pytest
 import haydi as hd
+from conftest import skip_iter_elements
 
 
 def test_mapping_strict():
@@ -96,3 +98,47 @@ def test_mappings_map_class():
 
     m = hd.Mappings(r, r, map_class=dict)
     assert not m.strict
+
+
+def test_mapping_rank():
+    ax = hd.USet(2, "a")
+    for m in (hd.Mappings(hd.Range(3), hd.Range(2) * hd.Range(2)),
+              hd.Mappings(ax, ax, map_class=tuple),
+              hd.Mappings(ax, hd.Range(3), map_class=dict)):
+        assert [m.unrank(i) for i in xrange(m.size)] == list(m)
+        assert [m.rank(x) for x in m] == range(m.size)
+
+    m = hd.Mappings(hd.Range(2), hd.Range(2))
+    with pytest.raises(ValueError):
+        m.rank(hd.Map(((0, 1),)))
+    with pytest.raises(ValueError):
+        m.rank(hd.Map(((0, 1), (2, 1))))
+
+
+def check_skip_iter(domain, expected):
+    assert list(domain) == expected
+    for i in xrange(domain.size + 2):
+        assert set(skip_iter_elements(domain, i)) <= set(expected)
+    result = []
+    for i in xrange(0, domain.size, 3):
+        result.extend(domain.iterate_steps(i, min(i + 3, domain.size)))
+    assert result == expected
+
+
+def test_mapping_skip_iter():
+    r = hd.Range(3)
+    m = hd.Mappings(r, r.filter(lambda x: x != 1))
+    expected = [x for x in hd.Mappings(r, r)
+                if all(v != 1 for k, v in x.items)]
+    check_skip_iter(m, expected)
+
+    m = hd.Mappings(r, r.filter(lambda x: x != 1), map_class=tuple)
+    expected = [x for x in hd.Mappings(r, r, map_class=tuple)
+                if all(v != 1 for k, v in x)]
+    check_skip_iter(m, expected)
+
+
+def test_mapping_unsorted_keys():
+    m = hd.Mappings(hd.Values((3, 1)), hd.Range(2))
+    assert list(m)[1] == hd.Map(((1, 0), (3, 1)))
+    assert list(m)[1].items == ((1, 0), (3, 1))
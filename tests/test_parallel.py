@@ -0,0 +1,178 @@
+import time
+from datetime import timedelta
+import pytest
+
+import haydi as hd
+
+
+@pytest.fixture(scope="module")
+def ctx():
+    return hd.ParallelContext(processes=4, job_size=100)
+
+
+def test_parallel_map(ctx):
+    count = 10000
+    x = hd.Range(count)
+    result = x.map(lambda x: x + 1).collect().run(ctx)
+
+    assert result == [item + 1 for item in xrange(count)]
+
+
+def test_parallel_filter(ctx):
+    x = hd.Range(211)
+    y = x * x
+    i = y.map(lambda x: x * 10).filter(lambda x: x < 600)
+    assert i.run(ctx) == i.run()
+
+
+def test_parallel_take(ctx):
+    x = hd.Range(10).filter(lambda x: x > 5).take(3)
+    assert x.run(ctx) == [6, 7, 8]
+    assert hd.Range(100).filter(lambda x: x > 50).first().run(ctx) == 51
+
+
+def test_parallel_reduce(ctx):
+    r = hd.Range(1000)
+    assert r.reduce(lambda x, y: x + y).run(ctx) == sum(xrange(1000))
+    assert r.max(lambda x: x % 100, 3).run(ctx) == [99, 199, 299]
+
+    result = r.groups(lambda x: x % 3, 2).run(ctx)
+    assert result == {0: [0, 3], 1: [1, 4], 2: [2, 5]}
+
+
+def test_parallel_generate(ctx):
+    result = hd.Range(10).generate(100).run(ctx)
+    assert len(result) == 100
+    for i in result:
+        assert 0 <= i < 10
+
+
+def test_parallel_precompute(ctx):
+    states = hd.USet(2, "q")
+    alphabet = hd.USet(2, "a")
+
+    delta = hd.Mappings(states * alphabet, states)
+    r1 = delta.cnfs().run()
+    r2 = delta.cnfs().run(ctx)
+
+    # atoms are unpickled as new objects, so they are compared by repr
+    assert map(repr, r1) == map(repr, r2)
+
+
+@pytest.mark.slow
+def test_parallel_timeout(ctx):
+    r = hd.Range(100000)
+
+    def fn(x):
+        return sum(xrange(x * x))
+
+    result = r.map(fn).max(lambda x: x).run(
+        ctx, timeout=timedelta(seconds=4))
+    assert result is not None
+    assert result > 0
+
+    def slow(x):
+        time.sleep(0.001)
+        return x
+
+    # jobs run until shortly before the timeout (not only for one element)
+    result = r.map(slow).collect().run(ctx, timeout=4)
+    assert len(result) > 8000
+    assert len(set(result)) == len(result)
+
+
+def test_parallel_subsets(ctx):
+    from haydi.base.runtime.strategy import create_strategy, StepStrategy
+
+    f = hd.Subsets(hd.Range(8).filter(lambda x: x % 3 != 0), 2, 3)
+    p = f.map(lambda s: sum(s.items)).collect()
+    assert isinstance(create_strategy(p), StepStrategy)
+    assert p.run(ctx) == p.run()
+
+
+def test_parallel_permutations(ctx):
+    from haydi.base.runtime.strategy import create_strategy, StepStrategy
+
+    p = hd.Permutations(hd.Range(6)).filter(lambda x: x[0] < x[-1]).collect()
+    assert isinstance(create_strategy(p), StepStrategy)
+    assert p.run(ctx) == p.run()
+
+
+def test_parallel_filtered_mappings(ctx):
+    from haydi.base.runtime.strategy import create_strategy, StepStrategy
+
+    r = hd.Range(4)
+    p = hd.Mappings(r, r.filter(lambda x: x != 2)).collect()
+    assert isinstance(create_strategy(p), StepStrategy)
+    assert p.run(ctx) == p.run()
+
+    s = hd.Sequences(r.filter(lambda x: x % 2), 0, 5).collect()
+    assert isinstance(create_strategy(s), StepStrategy)
+    assert s.run(ctx) == s.run()
+
+
+def test_parallel_cnfs_split(ctx):
+    from haydi.base.runtime.strategy import create_strategy, CnfSplitStrategy
+
+    states = hd.USet(3, "q")
+    alphabet = hd.USet(2, "a")
+    delta = hd.Mappings(states * alphabet, states)
+
+    r1 = delta.cnfs().run()
+    for depth in (None, 1, 3):
+        p = delta.cnfs(split_depth=depth).collect()
+        strategy = create_strategy(p)
+        assert isinstance(strategy, CnfSplitStrategy)
+        assert strategy.size > 1
+        r2 = p.run(ctx)
+        assert map(repr, r1) == map(repr, r2)
+
+
+def test_parallel_stream(ctx):
+    r = hd.Range(1000).map(lambda x: x * 2)
+    assert list(r.stream(ctx)) == range(0, 2000, 2)
+    assert list(r.take(150).stream(ctx, max_pending=1)) == range(0, 300, 2)
+
+    it = r.stream(ctx)
+    assert next(it) == 0
+    it.close()
+
+
+def test_parallel_take_early_stop(ctx):
+    r = hd.Range(10 ** 12)
+    assert r.filter(lambda x: x % 1000 == 999).take(3).run(ctx) == \
+        [999, 1999, 2999]
+    assert r.filter(lambda x: x > 12345).first().run(ctx) == 12346
+
+
+def test_parallel_interrupted_job():
+    from haydi.base.runtime.job import Job
+    from haydi.base.runtime.strategy import create_strategy
+    from haydi.base.runtime.util import TimeoutManager
+
+    ctx = hd.ParallelContext(processes=2, safety_margin=1)
+    strategy = create_strategy(hd.Range(1000).collect())
+    job = Job("w", 100, 100)
+    job.interrupted = True
+    job.processed_count = 30
+    job.finish([])
+
+    assert ctx._get_job_rest(strategy, job, None)[1:] == (130, 70)
+    assert ctx.gaps == []
+    assert ctx._get_job_rest(strategy, job, TimeoutManager(0.5)) is None
+    assert ctx.gaps == [(130, 200)]
+
+
+@pytest.mark.slow
+def test_parallel_timeout_gaps():
+    def slow(x):
+        time.sleep(0.001)
+        return x
+
+    # jobs take more than one second, they are interrupted
+    ctx = hd.ParallelContext(processes=2, job_size=1000, safety_margin=1)
+    result = hd.Range(100000).map(slow).collect().run(ctx, timeout=2)
+    assert result
+    assert ctx.gaps
+    for start, end in ctx.gaps:
+        assert not [x for x in result if start <= x < end]
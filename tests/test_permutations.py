@@ -1,4 +1,6 @@
+import pytest
 import haydi as hd
+from conftest import skip_iter_elements
 
 
 def test_permutations_iterate():
@@ -31,3 +33,41 @@ def test_permutations_to_values_maxsize():
     assert isinstance(v, hd.Permutations)
     assert isinstance(v.domain, hd.Values)
     assert list(v) == list(p)
+
+
+def test_permutations_rank():
+    p = hd.Permutations(hd.Values(("A", "B", "C", "D")))
+    assert [p.unrank(i) for i in xrange(p.size)] == list(p)
+    assert [p.rank(x) for x in p] == range(p.size)
+    with pytest.raises(ValueError):
+        p.rank(("A", "A", "B", "C"))
+    with pytest.raises(ValueError):
+        p.rank(("A", "B"))
+
+
+def test_permutations_iter_set():
+    p = hd.Permutations(hd.Range(5))
+    assert p.step_jumps
+    a = list(p)
+    for i in xrange(p.size + 2):
+        assert list(p.create_iter(i)) == a[i:]
+
+
+def test_permutations_skip_iter():
+    r = hd.Range(5)
+    p = hd.Permutations(r.filter(lambda x: x != 2))
+    assert p.filtered
+    assert p.step_jumps
+    expected = list(hd.Permutations(hd.Values((0, 1, 3, 4))))
+    assert list(p) == expected
+
+    for i in xrange(p.size + 2):
+        assert skip_iter_elements(p, i) == expected[i:]
+
+
+def test_permutations_iterate_steps():
+    p = hd.Permutations(hd.Values("ABCD"))
+    result = []
+    for i in xrange(0, p.size, 5):
+        result.extend(p.iterate_steps(i, min(i + 5, p.size)))
+    assert result == list(p)
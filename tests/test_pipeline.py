@@ -1,5 +1,6 @@
 import pytest
 import haydi as hd # noqa
+from haydi.base.exception import HaydiException
 
 
 def test_iterate():
@@ -39,3 +40,14 @@ def test_pipeline_repr():
     assert repr(p) == \
         "<Pipeline for Range: method=cnfs ts=[MapTransformation, " \
         "FilterTransformation] action=Max>"
+
+
+def test_stream():
+    r = hd.Range(10)
+    it = r.map(lambda x: x * x).stream()
+    assert next(it) == 0
+    assert list(it) == [x * x for x in xrange(1, 10)]
+    assert list(r.take(3).stream()) == [0, 1, 2]
+
+    with pytest.raises(HaydiException):
+        r.max().stream()
@@ -1,3 +1,4 @@
+import pytest
 import haydi as hd
 import itertools
 
@@ -338,3 +339,26 @@ def test_product_to_values_maxsize():
     assert isinstance(v, hd.Product)
     assert all(isinstance(d, hd.Values) for d in v.domains)
     assert list(v) == list(p)
+
+
+def test_product_rank():
+    p = hd.Range(3) * hd.Values(("a", "b")) * hd.Range(4)
+    assert [p.unrank(i) for i in xrange(p.size)] == list(p)
+    assert [p.rank(x) for x in p] == range(p.size)
+    assert p[-1] == (2, "b", 3)
+
+    with pytest.raises(ValueError):
+        p.rank((1, "c", 1))
+    with pytest.raises(ValueError):
+        p.rank((1, "a"))
+    with pytest.raises(Exception):
+        hd.Product((hd.Range(3).filter(lambda x: x > 1),)).unrank(0)
+
+
+def test_uproduct_rank():
+    r = hd.Range(5)
+    p = hd.Product((r, r), unordered=True)
+    assert [p.unrank(i) for i in xrange(p.size)] == list(p)
+    assert [p.rank(x) for x in p] == range(p.size)
+    with pytest.raises(ValueError):
+        p.rank((1, 3))
@@ -1,3 +1,4 @@
+import pytest
 import haydi as hd
 
 
@@ -78,3 +79,21 @@ def test_range_to_values_maxsize():
     v = r.to_values(max_size=r.size - 1)
 
     assert r == v
+
+
+def test_range_rank():
+    r = hd.Range(4, 15, 3)
+    assert [r.unrank(i) for i in xrange(r.size)] == list(r)
+    assert [r.rank(x) for x in r] == range(r.size)
+    assert r[-1] == 13
+    with pytest.raises(IndexError):
+        r.unrank(4)
+    with pytest.raises(ValueError):
+        r.rank(5)
+    with pytest.raises(ValueError):
+        r.rank(16)
+
+
+def test_range_size_step():
+    for args in ((4, 15, 3), (4, 16, 3), (-5, 10, 2), (-5, 11, 2), (3, 4, 5)):
+        assert hd.Range(*args).size == len(range(*args))
@@ -0,0 +1,162 @@
+import haydi as hd
+from haydi.base.runtime.costmodel import CostModel
+from haydi.base.runtime.job import Job
+from haydi.base.runtime.scheduler import JobScheduler
+from haydi.base.runtime.strategy import create_strategy
+from haydi.base.runtime.trace import Tracer
+
+
+def make_scheduler(pipeline, worker_count, policy=None):
+    scheduler = JobScheduler(None, worker_count, create_strategy(pipeline),
+                             None, Tracer(), policy=policy)
+    scheduler.job_size = 100
+    return scheduler
+
+
+def test_cost_model():
+    model = CostModel(6400, region_count=64, alpha=0.5)
+    assert model.predict_cost(0) is None
+    assert model.get_job_size(0, 10) is None
+
+    model.add_job(0, 100, 1.0)
+    assert model.predict_cost(0) == 0.01
+    assert model.predict_cost(5000) == 0.01
+    assert model.get_job_size(5000, 10) == 1000
+
+    model.add_job(5000, 100, 3.0)
+    assert model.predict_cost(5000) == 0.03
+    assert model.predict_cost(0) == 0.01
+    assert model.predict_cost(3000) == 0.02
+
+    model.add_job(5000, 100, 1.0)
+    assert model.predict_cost(5000) == 0.02
+
+    model = CostModel()
+    model.add_job(0, 10, 0.0)
+    assert model.predict_cost(10 ** 9) == model.min_duration / 10
+
+
+def test_job_sizes():
+    scheduler = make_scheduler(hd.Range(100000).iterate(), 4,
+                               hd.SchedulingPolicy(target_time=10))
+    assert scheduler._create_job_sizes(4) == [100] * 4
+
+    # Growth is limited
+    scheduler.cost_model.add_job(0, 100, 0.1)
+    assert scheduler._create_job_sizes(2) == [400, 400]
+
+    # Each job is sized by the cost of its region
+    scheduler.job_size = 1000
+    scheduler.cost_model.add_job(2000, 100, 10.0)
+    scheduler.cost_model.add_job(4000, 100, 0.5)
+    scheduler.index_scheduled = 2000
+    sizes = scheduler._create_job_sizes(13)
+    assert sizes == [100] * 12 + [2000]
+
+
+def test_tail_job_sizes():
+    scheduler = make_scheduler(hd.Range(10000).iterate(), 4)
+    assert scheduler.strategy.splittable
+
+    scheduler.index_scheduled = 9900
+    distribution = scheduler._create_job_sizes(100)
+    assert sum(distribution) == 100
+    assert distribution[:4] == [13, 11, 10, 9]
+    assert distribution == sorted(distribution, reverse=True)
+    assert distribution[-1] == 1
+
+    scheduler.index_scheduled = 10000
+    assert scheduler._create_job_sizes(4) == []
+
+
+def make_interrupted_job(start, size, processed_count):
+    job = Job("w", start, size)
+    job.interrupted = True
+    job.processed_count = processed_count
+    job.finish([])
+    return job
+
+
+def test_interrupted_jobs():
+    scheduler = make_scheduler(hd.Range(1000).iterate(), 4)
+    scheduler.index_scheduled = 300
+
+    job = make_interrupted_job(0, 100, 40)
+    assert job.last_index == 40
+    scheduler._mark_job_completed(job)
+    assert scheduler.index_completed == 40
+    assert list(scheduler.requeued) == [(40, 100)]
+    assert scheduler._has_more_work()
+
+    scheduler.canceled = True
+    scheduler._mark_job_completed(make_interrupted_job(100, 100, 0))
+    scheduler._mark_job_completed(make_interrupted_job(200, 100, 100))
+    assert scheduler.index_completed == 140
+    assert list(scheduler.requeued) == [(40, 100)]
+    assert scheduler.gaps == [(100, 200)]
+    assert scheduler.index_uncovered == 100
+
+    pipeline = (hd.USet(3, "a") + hd.Range(5000)).cnfs()
+    scheduler = make_scheduler(pipeline, 4)
+    assert not scheduler.strategy.splittable
+    scheduler.index_scheduled = 100
+    scheduler._mark_job_completed(make_interrupted_job(0, 100, 30))
+    assert scheduler.gaps == [(30, 100)]
+    assert not scheduler._has_running_jobs()
+
+
+class FakeExecutor(object):
+
+    def map(self, fn, args):
+        return list(args)
+
+
+def test_requeued_jobs_budget():
+    scheduler = make_scheduler(hd.Range(1000).iterate(), 4)
+    scheduler.executor = FakeExecutor()
+    scheduler.cached_args = scheduler.strategy.create_cached_args()
+    scheduler.max_pending = 3
+    scheduler.index_scheduled = 1000
+    scheduler.requeued.extend((i, i + 10) for i in xrange(0, 50, 10))
+
+    batches = scheduler._schedule(2)
+    assert [(start, size) for _, start, size in batches] == \
+        [(0, 10), (10, 10), (20, 10)]
+    assert list(scheduler.requeued) == [(30, 40), (40, 50)]
+    assert scheduler.jobs_running == 3
+
+
+def test_resumed_jobs_result_limit():
+    scheduler = make_scheduler(hd.Range(1000).take(3), 4)
+    jobs = [Job("w", 0, 100), Job("w", 100, 100)]
+    jobs[0].finish([1, 2])
+    jobs[1].finish([150])
+    scheduler.add_resumed_jobs(jobs)
+    assert scheduler.limit_reached
+    assert scheduler._init_futures(4) == []
+
+
+def test_job_sizes_not_splittable():
+    pipeline = (hd.USet(3, "a") + hd.Range(5000)).cnfs()
+    scheduler = make_scheduler(pipeline, 4)
+    assert not scheduler.strategy.splittable
+    assert scheduler._create_job_sizes(4) == [100] * 4
+
+
+def test_policies():
+    policy = hd.ThroughputPolicy()
+    assert policy.get_initial_job_size(None, 16) == 200
+    assert policy.get_initial_job_size(1000, 16) == 63
+
+    scheduler = make_scheduler(hd.Range(10000).iterate(), 4,
+                               hd.FixedSizePolicy(300))
+    scheduler.cost_model.add_job(0, 100, 100.0)
+    assert scheduler.policy.get_initial_job_size(10000, 16) == 300
+    scheduler.index_scheduled = 9000
+    assert scheduler._create_job_sizes(5) == [300, 300, 300, 100]
+
+    scheduler = make_scheduler(hd.Range(10000).iterate(), 4,
+                               hd.LatencyPolicy())
+    assert scheduler.backlog_per_worker == 2
+    scheduler.cost_model.add_job(0, 100, 0.1)
+    assert scheduler._create_job_sizes(2) == [200, 200]
@@ -1,4 +1,6 @@
+import pytest
 import haydi as hd
+from conftest import skip_iter_elements
 
 
 def test_sequence_flags():
@@ -96,3 +98,23 @@ def test_sequence_operator():
     s2 = r ** 4
 
     assert list(s1) == list(s2)
+
+
+def test_sequence_rank():
+    for s in (hd.Sequences(hd.Range(3), 3), hd.Sequences(hd.Range(3), 0, 3)):
+        assert [s.unrank(i) for i in xrange(s.size)] == list(s)
+        assert [s.rank(x) for x in s] == range(s.size)
+    with pytest.raises(ValueError):
+        hd.Sequences(hd.Range(3), 1, 2).rank((1, 1, 1))
+
+
+def test_sequence_skip_iter():
+    r = hd.Range(3)
+    f = r.filter(lambda x: x != 1)
+    for s, u in ((hd.Sequences(f, 3), hd.Sequences(r, 3)),
+                 (hd.Sequences(f, 0, 3), hd.Sequences(r, 0, 3))):
+        expected = [x for x in u if 1 not in x]
+        assert list(s) == expected
+        for i in xrange(s.size + 2):
+            assert skip_iter_elements(s, i) == \
+                [x for x in u.create_iter(i) if 1 not in x]
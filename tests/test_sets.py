@@ -1,4 +1,6 @@
+import pytest
 import haydi as hd
+from conftest import skip_iter_elements
 
 
 def test_sets_strict():
@@ -113,3 +115,71 @@ def test_sets_in_sets():
     assert set(s) == {frozenset(), frozenset([frozenset()]),
                       frozenset([frozenset(), frozenset([0])]),
                       frozenset([frozenset([0])])}
+
+
+def test_sets_rank():
+    r = hd.Range(5)
+    for s in (hd.Subsets(r), hd.Subsets(r, 2), hd.Subsets(r, 0, 2),
+              hd.Subsets(r, 2, 4), hd.Subsets(r, 0, 0),
+              hd.Subsets(hd.Values(("b", "a", "c")), set_class=tuple)):
+        assert [s.unrank(i) for i in xrange(s.size)] == list(s)
+        assert [s.rank(x) for x in s] == range(s.size)
+
+    s = hd.Subsets(hd.Subsets(hd.Range(3), 2))
+    assert [s.unrank(i) for i in xrange(s.size)] == list(s)
+    assert [s.rank(x) for x in s] == range(s.size)
+
+    with pytest.raises(ValueError):
+        hd.Subsets(r, 2).rank(hd.Set((1,)))
+    with pytest.raises(ValueError):
+        hd.Subsets(r, 2).rank(hd.Set((1, 7)))
+
+
+def test_sets_iter_set():
+    r = hd.Range(5)
+    for s in (hd.Subsets(r), hd.Subsets(r, 2), hd.Subsets(r, 0, 2),
+              hd.Subsets(r, 2, 4), hd.Subsets(r, 5),
+              hd.Subsets(hd.Subsets(hd.Range(3), 2))):
+        assert s.step_jumps
+        a = list(s)
+        for i in xrange(s.size + 2):
+            assert list(s.create_iter(i)) == a[i:]
+
+
+def test_sets_skip_iter():
+    r = hd.Range(6)
+    f = r.filter(lambda x: x % 3 != 1)
+    for s, u in ((hd.Subsets(f), hd.Subsets(r)),
+                 (hd.Subsets(f, 2), hd.Subsets(r, 2)),
+                 (hd.Subsets(f, 1, 3), hd.Subsets(r, 1, 3)),
+                 (hd.Subsets(f, 3, 4), hd.Subsets(r, 3, 4)),
+                 (hd.Subsets(f * f, 0, 2), hd.Subsets(r * r, 0, 2))):
+        assert s.filtered
+        assert s.step_jumps
+        # Unfiltered subsets without filtered elements
+        expected = [x for x in u
+                    if all(not isinstance(y, tuple) and y % 3 != 1 or
+                           isinstance(y, tuple) and y[0] % 3 != 1 and
+                           y[1] % 3 != 1 for y in x.items)]
+        assert list(s) == expected
+        expected = set(expected)
+        for i in xrange(s.size + 2):
+            assert skip_iter_elements(s, i) == \
+                [x for x in u.create_iter(i) if x in expected]
+
+
+def test_sets_iterate_steps():
+    f = hd.Range(6).filter(lambda x: x != 2)
+    s = hd.Subsets(f, 1, 3)
+    result = []
+    for i in xrange(0, s.size, 4):
+        result.extend(s.iterate_steps(i, min(i + 4, s.size)))
+    assert result == list(s)
+
+
+def test_subsets_unsorted_domain():
+    v = hd.Values((3, 1, 2, 1))
+    for subsets in (hd.Subsets(v, 2), hd.Subsets(v.filter(lambda x: x != 2))):
+        result = list(subsets)
+        assert all(list(s.items) == sorted(s.items) for s in result)
+    assert hd.Set((2, 1)) in list(hd.Subsets(hd.Values((2, 1))))
@@ -87,3 +87,23 @@ def test_cnfs_invalid_values():
 
     with pytest.raises(Exception):
         hd.CnfValues([(a2, a2)])
+
+
+def test_values_rank():
+    v = hd.Values(("a", "b", 123))
+    assert [v[i] for i in xrange(3)] == ["a", "b", 123]
+    assert v.rank(123) == 2
+    with pytest.raises(ValueError):
+        v.rank("c")
+
+    ax = hd.USet(3, "a")
+    assert list(ax) == [ax[i] for i in xrange(3)]
+    assert [ax.rank(a) for a in ax] == [0, 1, 2]
+    with pytest.raises(ValueError):
+        ax.rank(hd.USet(3, "a").get(0))
+
+
+def test_cnfs_values_rank():
+    ax = hd.USet(3, "a")
+    with pytest.raises(Exception):
+        hd.CnfValues((ax.get(0),)).unrank(0)
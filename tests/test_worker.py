@@ -0,0 +1,203 @@
+import time
+
+import haydi as hd
+from haydi.base.runtime import iterhelpers
+from haydi.base.runtime.cancel import CancelFlag
+from haydi.base.runtime.job import ResultCollector
+from haydi.base.runtime.worker import (worker_compute, worker_step,
+                                       worker_cnf_split)
+from conftest import make_job
+
+
+def test_worker_compute_collect():
+    job = worker_compute(iter(xrange(10)), 0, 10, None, None, None)
+    assert job.result == range(10)
+    assert job.size == 10
+
+    job = worker_compute(iter(xrange(10)), 0, 10, None, None, None, 3)
+    assert job.result == [0, 1, 2]
+    assert job.size == 10
+
+
+def test_worker_compute_reduce_streaming():
+    live = [0]
+
+    def items():
+        for i in xrange(1000):
+            live[0] += 1
+            yield i
+
+    def reduce_fn(acc, item):
+        # the worker has to fold items as they come
+        assert live[0] == item + 1
+        return acc + item
+
+    job = worker_compute(items(), 0, 1000, None, reduce_fn, lambda: 0)
+    assert job.result == sum(xrange(1000))
+
+    job = worker_compute(iter(xrange(1, 5)), 0, 4, None,
+                         lambda x, y: x * y, None)
+    assert job.result == 24
+
+
+def test_worker_compute_timelimit():
+    job = worker_compute(iter(xrange(10)), 0, 10, time.time(),
+                         lambda x, y: x + y, lambda: 0)
+    assert job.result == 0
+    assert job.interrupted
+    assert job.processed_count == 1
+
+    job = worker_compute(iter(xrange(10)), 0, 10, time.time() + 100,
+                         None, None, safety_margin=0)
+    assert job.result == range(10)
+    assert not job.interrupted
+    assert job.processed_count == 10
+
+
+def test_worker_compute_cancel(monkeypatch):
+    monkeypatch.setattr(iterhelpers, "CANCEL_CHECK_INTERVAL", 0)
+    flag = CancelFlag()
+
+    def items():
+        for i in xrange(1000):
+            if i == 5:
+                flag.set()
+            yield i
+
+    job = worker_compute(items(), 0, 1000, None, None, None,
+                         cancel_flag=flag)
+    assert job.result == range(5)
+    assert job.interrupted
+    assert job.processed_count == 5
+
+
+def test_worker_step_cancel(monkeypatch):
+    monkeypatch.setattr(iterhelpers, "CANCEL_CHECK_INTERVAL", 0)
+    flag = CancelFlag()
+
+    def fn(x):
+        if x == 25:
+            flag.set()
+        return False
+
+    pipeline = hd.Range(100).filter(fn).collect()
+    args = {"domain": pipeline.domain,
+            "transformations": pipeline.transformations,
+            "reduce_fn": None,
+            "reduce_init": None,
+            "timelimit": None,
+            "result_limit": None,
+            "safety_margin": 0,
+            "cancel_flag": flag}
+
+    job = worker_step((args, 10, 50))
+    assert job.result == []
+    assert job.interrupted
+    assert job.processed_count == 16
+
+    flag = CancelFlag()
+    args["cancel_flag"] = flag
+    job = worker_step((args, 30, 50))
+    assert not job.interrupted
+    assert job.processed_count == 50
+
+
+def test_worker_cnf_split_cancel(monkeypatch):
+    monkeypatch.setattr(iterhelpers, "CANCEL_CHECK_INTERVAL", 0)
+    flag = CancelFlag()
+
+    def fn(x):
+        flag.set()
+        return True
+
+    ax = hd.USet(3, "a")
+    domain = hd.Mappings(ax * ax, ax)
+    size = domain.get_cn_split_size(2)
+    pipeline = domain.cnfs(split_depth=2).filter(fn).collect()
+    args = {"domain": pipeline.domain,
+            "transformations": pipeline.transformations,
+            "reduce_fn": None,
+            "reduce_init": None,
+            "timelimit": None,
+            "result_limit": None,
+            "safety_margin": 0,
+            "split_depth": 2,
+            "cancel_flag": flag}
+
+    # the job stops between units, so the finished units are complete
+    job = worker_cnf_split((args, 0, size))
+    assert job.interrupted
+    assert job.processed_count == 1
+    assert job.result == list(domain.create_cn_split_iter(2, 0, 1))
+
+    args["cancel_flag"] = None
+    rest = worker_cnf_split((args, job.last_index, size - 1))
+    assert not rest.interrupted
+    assert job.result + rest.result == list(domain.create_cn_iter())
+
+
+def test_result_collector_ordered():
+    # Concatenation is associative but not commutative
+    pipeline = hd.Range(6).map(str).reduce(lambda x, y: x + y, "")
+    collector = ResultCollector(pipeline)
+    assert collector.incremental
+
+    jobs = [make_job(4, 2, "45"), make_job(0, 2, "01"), make_job(2, 2, "23")]
+    collector.add(jobs[0])
+    assert jobs[0].result == "45"  # waits for preceding jobs
+    collector.add(jobs[1])
+    assert jobs[1].result is None
+    collector.add(jobs[2])
+    assert len(collector.buffer) == 0
+    assert collector.get_result() == "012345"
+
+    pipeline = hd.Range(6).map(str).reduce(lambda x, y: x + y, "",
+                                           associative=False)
+    collector = ResultCollector(pipeline)
+    collector.add(make_job(2, 2, ["2", "3"]))
+    collector.add(make_job(0, 2, ["0", "1"]))
+    assert collector.get_result() == "0123"
+
+
+def test_result_collector_gap():
+    pipeline = hd.Range(6).map(str).reduce(lambda x, y: x + y, "")
+    collector = ResultCollector(pipeline)
+    collector.add(make_job(4, 2, "45"))
+    collector.add(make_job(0, 2, "01"))
+    assert collector.get_result() == "0145"
+
+    assert ResultCollector(pipeline).get_result() == []
+
+
+def test_result_collector_max():
+    # items of the result are in the order of indices
+    pipeline = hd.Range(6).max(lambda x: x % 3)
+    collector = ResultCollector(pipeline)
+    job = make_job(3, 3, (2, [5]))
+    collector.add(job)
+    collector.add(make_job(0, 3, (2, [2])))
+    assert job.result is None
+    assert collector.get_result() == (2, [2, 5])
+
+
+def test_result_collector_bounded():
+    pipeline = hd.Range(6).max(lambda x: x % 3, 1)
+    collector = ResultCollector(pipeline)
+    collector.add(make_job(3, 3, (2, [5])))
+    collector.add(make_job(0, 3, (2, [2])))
+    assert collector.get_result() == (2, [2])
+
+    pipeline = hd.Range(6).groups(lambda x: x % 3, 1)
+    collector = ResultCollector(pipeline)
+    collector.add(make_job(3, 3, {0: [3]}))
+    collector.add(make_job(0, 3, {0: [0]}))
+    assert collector.get_result() == {0: [0]}
+
+
+def test_result_collector_collect():
+    pipeline = hd.Range(6).collect()
+    collector = ResultCollector(pipeline)
+    assert not collector.incremental
+    collector.add(make_job(3, 3, [3, 4, 5]))
+    collector.add(make_job(0, 3, [0, 1, 2]))
+    assert collector.get_result() == range(6)